@@ -1,14 +1,14 @@
 import os
+import re
 import sys
 import json
 import time
-import PyPDF2
-import requests  # ✅ For Webhook
+import threading
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from google import genai
-from google.genai import types
-from google.genai import errors
+
+# ⚡ Heavy modules (google-genai, requests, PyPDF2, voice -> pyaudio/librosa) are imported
+# on first use so that importing this file stays fast. See get_client() / load_voice_module().
 
 # --- 🔧 FIX IMPORT PATH ---
 # 1. Get the current folder where this script is
@@ -20,9 +20,27 @@ voice_folder_path = os.path.join(parent_dir, "Voice_Confidence")
 
 # 4. Add that FOLDER to the system path so Python can find voice.py
 sys.path.append(voice_folder_path)
+# 5. Shared/ holds helpers used by both servers
+sys.path.append(os.path.join(parent_dir, "Shared"))
+import telemetry
+from tracing import NULL_TRACE, traced
+from prompt_cache import PromptCache
+import llm_replay
+from llm_pool import ClientPool
+from resume_index import get_index
+
+# 🔥 THE VOICE FILE IS IMPORTED LAZILY
+voice = None
+_voice_lock = threading.Lock()
 
-# 🔥 NOW IMPORT THE VOICE FILE
-import voice
+def load_voice_module():
+    global voice
+    if voice is None:
+        with _voice_lock:
+            if voice is None:
+                import voice as voice_module
+                voice = voice_module
+    return voice
 
 # Load environment variables
 load_dotenv()
@@ -32,22 +50,90 @@ key_1 = os.getenv("GEMINI_KEY_TOPICS")
 key_2 = os.getenv("GEMINI_KEY_ASKER")
 key_3 = os.getenv("GEMINI_KEY_GRADER")
 
-# ✅ Webhook Configuration
-WEBHOOK_URL = "https://vgamai.app.n8n.cloud/webhook-test/b1bd00ca-d5a8-4cb9-af5c-e9e11fee4410" 
+# ✅ Webhook Configuration (override with WEBHOOK_URL, e.g. to point load tests at a local fake)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://vgamai.app.n8n.cloud/webhook-test/b1bd00ca-d5a8-4cb9-af5c-e9e11fee4410")
+
+# Optional Gemini endpoint override (e.g. benchmarks/fake_services.py); empty = Google's API
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+
+ROLE_KEYS = {"topics": key_1, "asker": key_2, "grader": key_3}
+
+# Every call uses the same model (a context cache only works with the model it was created for)
+LLM_MODEL = "gemini-flash-latest"
+
+# One Gemini round trip per answer (grade + next question) instead of two; the two-call path
+# stays as the fallback. Sessions can override it ({"combinedTurn": true} in the init message).
+COMBINED_TURN = os.getenv("LLM_COMBINED_TURN", "0") == "1"
+
+# Streamed questions are forwarded a sentence at a time; shorter pieces ("e.g.") wait for more text
+MIN_DELTA_CHARS = 12
+SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+def pop_sentences(buffer, min_chars=MIN_DELTA_CHARS):
+    """Splits the complete sentences off the front of buffer -> (sentences, rest)."""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(buffer):
+        if match.end() - start >= min_chars:
+            sentences.append(buffer[start:match.end()].strip())
+            start = match.end()
+    return sentences, buffer[start:]
+
+# Extra keys (comma-separated) join the pool; every key serves every role (see llm_pool.py)
+EXTRA_KEYS = [k.strip() for k in os.getenv("GEMINI_KEYS", "").split(",") if k.strip()]
+
+def all_keys():
+    return [k for k in list(ROLE_KEYS.values()) + EXTRA_KEYS if k]
+
+def keys_configured():
+    return bool(all_keys())
+
+def home_key(role):
+    """The role's own key, else the first one. Context caches stay on the key that created them."""
+    return ROLE_KEYS.get(role) or next(iter(all_keys()), None)
 
-if not key_1 or not key_2 or not key_3:
-    print("❌ ERROR: Please ensure you have 3 keys in your .env file")
-    exit()
+def make_client(api_key):
+    from google import genai
+    from google.genai import types
+    http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+    return genai.Client(api_key=api_key, http_options=http_options)
 
-# Initialize Clients
-client_topics = genai.Client(api_key=key_1)
-client_asker  = genai.Client(api_key=key_2)
-client_grader = genai.Client(api_key=key_3)
+# The pool and its clients are built on first use, not at import
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ClientPool(all_keys(), make_client)
+    return _pool
+
+def get_client(role):
+    return get_pool().home_client(home_key(role))
 
 TARGET_JOB_DESCRIPTION = """
 File clerk
 """
 
+# Bump when to_state() changes shape; stored sessions from another version are not restored
+STATE_VERSION = 2     # 2: adds llm usage ("u") and the turn mode ("ct")
+
+# Resume context per prompt (see resume_index.py)
+TOPIC_SECTIONS, TOPIC_CONTEXT_CHARS = 4, 1600          # Topic pick: sections matching the job description
+QUESTION_SECTIONS, QUESTION_CONTEXT_CHARS = 2, 600     # Questions: sections matching the current topic
+
+# Shared by every asker / grader call of an interview; see prompt_cache.py
+def interviewer_prefix(job_description):
+    return f"""
+        You are a technical interviewer.
+        JOB ROLE / DESCRIPTION: {job_description}
+        RULES:
+        - Ask ONE direct interview question at a time. STRICTLY 1 or 2 sentences max.
+        - When grading, judge only whether the answer is factually correct.
+        """
+
 # --- 2. SCHEMAS ---
 class AnswerGrade(BaseModel):
     is_correct: bool = Field(description="True if correct")
@@ -56,26 +142,30 @@ class AnswerGrade(BaseModel):
 class TopicGenerator(BaseModel):
     topics: list[str] = Field(description="List of 1 technical topic.")
 
+class GradedTurn(BaseModel):
+    is_correct: bool = Field(description="True if correct")
+    feedback: str = Field(description="Reason")
+    next_question: str = Field(description="The next interview question, following the rule for this grade")
+
 # --- 3. THE BRAIN CLASS ---
 class AdaptiveInterviewer:
-    def __init__(self, resume_text, job_description):
+    combined_turn = COMBINED_TURN
+
+    def __init__(self, resume_text, job_description, trace=NULL_TRACE):
         self.job_description = job_description
+        self.prompt_cache = PromptCache(interviewer_prefix(job_description), get_client, LLM_MODEL)
+        # Per-session latency trace (see Shared/tracing.py); a no-op unless the session is sampled
+        self.trace = trace
         
         # 🔥 Initialize Voice System
-        # Assuming your voice.py has a class named VoiceAnalyzer based on your snippet
-        # If it is named VoiceSystem, change this to voice.VoiceSystem()
-        try:
-            print(f"\n 🎤 Initializing Voice System...")
-            self.voice_bot = voice.VoiceSystem() 
-        except AttributeError:
-            # Fallback if the class is named differently
-            self.voice_bot = voice.VoiceAnalyzer()
+        self._init_voice()
         
         # Scoring Storage
         self.skill_scores = [] 
         self.current_skill_score = 0 
         
         print(f"\n  Reading Resume...")
+        self.resume_index = get_index(resume_text)
         self.topics = self._get_topics_from_resume(resume_text)
         print(f"✅ Topic Locked: {self.topics}")
         
@@ -85,32 +175,117 @@ class AdaptiveInterviewer:
         self.questions_asked_in_current_topic = 0
         self.correct_answers_in_current_topic = 0
 
-    def _safe_api_call(self, client_instance, model, contents, config=None):
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                if config:
-                    return client_instance.models.generate_content(model=model, contents=contents, config=config)
-                return client_instance.models.generate_content(model=model, contents=contents)
-            except Exception as e:
-                if "429" in str(e) or "503" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                    time.sleep(2)
-                else:
-                    return None
+        # Gemini calls / tokens used by this interview (from usage_metadata)
+        self.llm_usage = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+    def _init_voice(self):
+        # Assuming your voice.py has a class named VoiceAnalyzer based on your snippet
+        # If it is named VoiceSystem, change this to voice.VoiceSystem()
+        voice = load_voice_module()
+        try:
+            print(f"\n 🎤 Initializing Voice System...")
+            self.voice_bot = voice.VoiceSystem() 
+        except AttributeError:
+            # Fallback if the class is named differently
+            self.voice_bot = voice.VoiceAnalyzer()
+
+    # --- 💾 SERIALIZABLE STATE (reconnects / multiple workers) ---
+    def to_state(self):
+        """Everything needed to continue this interview elsewhere, with short keys to stay compact."""
+        return {
+            "v": STATE_VERSION,
+            "jd": self.job_description,
+            "t": self.topics,
+            "i": self.current_topic_index,
+            "d": self.difficulty_level,
+            "qa": self.questions_asked_in_current_topic,
+            "ca": self.correct_answers_in_current_topic,
+            "ss": self.skill_scores,
+            "cs": self.current_skill_score,
+            "q": self.current_question_text,
+            "h": self.prompt_cache.history,
+            "r": self.resume_index.sections,
+            "u": self.llm_usage,
+            "ct": self.combined_turn,
+        }
+
+    @classmethod
+    def from_state(cls, state, trace=NULL_TRACE):
+        """Rebuilds an interviewer from to_state() output without re-reading the resume."""
+        if state.get("v") not in (1, STATE_VERSION):
+            raise ValueError(f"Unsupported interviewer state version: {state.get('v')}")
+        bot = cls.__new__(cls)
+        bot.job_description = state["jd"]
+        bot.prompt_cache = PromptCache(interviewer_prefix(bot.job_description), get_client, LLM_MODEL, state.get("h"))
+        bot.trace = trace
+        bot._init_voice()
+        bot.resume_index = get_index(sections=state.get("r", []))
+        bot.topics = list(state["t"])
+        bot.current_topic_index = state["i"]
+        bot.difficulty_level = state["d"]
+        bot.questions_asked_in_current_topic = state["qa"]
+        bot.correct_answers_in_current_topic = state["ca"]
+        bot.skill_scores = list(state["ss"])
+        bot.current_skill_score = state["cs"]
+        bot.current_question_text = state["q"]
+        bot.llm_usage = dict(state.get("u") or {"calls": 0, "prompt_tokens": 0, "output_tokens": 0})
+        if state.get("ct") is not None:
+            bot.combined_turn = bool(state["ct"])
+        return bot
+
+    def _safe_api_call(self, role, model, contents, config=None):
+        with self.trace.span(f"llm:{role}"), telemetry.LLM_REQUEST.labels(role).time():
+            # LLM_MODE=record/replay hooks in here (see llm_replay.py)
+            response = llm_replay.call(role, model, contents, config, self._call_with_retries)
+        if response is None:
+            telemetry.LLM_ERRORS.labels(role).inc()
+        else:
+            self._record_usage(role, response)
+        return response
+
+    def _record_usage(self, role, response):
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        self.llm_usage["calls"] += 1
+        self.llm_usage["prompt_tokens"] += prompt_tokens
+        self.llm_usage["output_tokens"] += output_tokens
+        telemetry.LLM_TOKENS.labels(role, "prompt").inc(prompt_tokens)
+        telemetry.LLM_TOKENS.labels(role, "output").inc(output_tokens)
+
+    def _call_with_retries(self, role, model, contents, config=None):
+        # Key choice, retries on other keys, breakers and hedging live in the pool (llm_pool.py)
+        def request(client):
+            if config:
+                return client.models.generate_content(model=model, contents=contents, config=config)
+            return client.models.generate_content(model=model, contents=contents)
+        return get_pool().call(role, request, pinned_api_key=self._pinned_key(role, config))
+
+    def _pinned_key(self, role, config):
+        # A cached prefix only exists under the key that created it
+        if config is not None and getattr(config, "cached_content", None):
+            return home_key(role)
         return None
 
+    def _resume_context(self, topic):
+        # Nothing rather than unrelated sections when the topic does not appear in the resume
+        context = self.resume_index.excerpt(topic, QUESTION_SECTIONS, QUESTION_CONTEXT_CHARS, fallback=False)
+        return f"- Candidate background: {context}" if context else ""
+
     def _get_topics_from_resume(self, text):
+        # Only the sections that match the job, not the header / contact block at the top
+        sections = self.resume_index.excerpt(self.job_description, TOPIC_SECTIONS, TOPIC_CONTEXT_CHARS)
         prompt = f"""
         You are a Technical Recruiter.
-        RESUME: {text[:2000]}...
+        RESUME: {sections or text[:2000]}...
         TARGET JOB: {self.job_description}
         TASK: Identify the TOP 1 single most important technical skill.
         """
         response = self._safe_api_call(
-            client_instance=client_topics, 
-            model="gemini-flash-latest",
+            role="topics", 
+            model=LLM_MODEL,
             contents=prompt,
-            config=types.GenerateContentConfig(
+            config=llm_replay.content_config(
                 response_mime_type="application/json",
                 response_schema=TopicGenerator
             )
@@ -122,52 +297,122 @@ class AdaptiveInterviewer:
                 pass
         return ["General Skills"]
 
-    def generate_question(self):
+    @traced("generate_question")
+    def generate_question(self, on_delta=None, announce=True):
+        """
+        Next question for the current topic / difficulty. With on_delta(text) the question is
+        streamed and every complete sentence is passed on as soon as Gemini produces it.
+        announce=False prepares the question ahead of time; announce_question() sends it to the webhook later.
+        """
         topic = self.topics[self.current_topic_index]
         prompt = f"""
-        You are a technical interviewer.
         CONTEXT:
-        - Job Role: {self.job_description}
         - Topic: {topic}
         - Difficulty: {self.difficulty_level}/3 (1=Easy, 3=Hard)
         - Question Count: {self.questions_asked_in_current_topic + 1}
+        {self._resume_context(topic)}
         TASK:
         Ask ONE direct interview question about {topic}.
-        - STRICTLY 1 or 2 sentences max.
         """
-        response = self._safe_api_call(
-            client_instance=client_asker,
-            model="gemini-flash-latest", 
-            contents=prompt
-        )
-        if response and response.text:
-            self.current_question_text = response.text.strip()
+        contents, config = self.prompt_cache.build("asker", prompt, with_summary=True)
+        question = self._stream_question(contents, config, on_delta) if on_delta else None
+        if question:
+            self.current_question_text = question
         else:
-            self.current_question_text = f"Tell me about {topic}."
+            response = self._safe_api_call(
+                role="asker",
+                model=LLM_MODEL, 
+                contents=contents,
+                config=config
+            )
+            if response and response.text:
+                self.current_question_text = response.text.strip()
+            else:
+                self.current_question_text = f"Tell me about {topic}."
             
+        # Full text only, once the stream is complete
+        if announce:
+            self._send_to_webhook()
+        return self.current_question_text
+
+    def announce_question(self):
+        self._send_to_webhook()
+
+    def _stream_question(self, contents, config, on_delta):
+        """Streams the asker call; returns the full text, or None if it failed (caller falls back)."""
+        role = "asker"
+        if llm_replay.LLM_MODE != "live":
+            # Recorded / replayed responses are whole; pass them on sentence by sentence
+            response = self._safe_api_call(role, LLM_MODEL, contents, config)
+            text = response.text.strip() if response and response.text else ""
+            sentences, rest = pop_sentences(text + " ")
+            for sentence in sentences + ([rest.strip()] if rest.strip() else []):
+                on_delta(sentence)
+            return text or None
+
+        text = ""
+        pending = ""
+        last_chunk = None
+        completed = False
+        started = time.perf_counter()
+        with self.trace.span(f"llm:{role}", stream=True), telemetry.LLM_REQUEST.labels(role).time():
+            try:
+                with get_pool().lease(role, self._pinned_key(role, config)) as client:
+                    stream = client.models.generate_content_stream(
+                        model=LLM_MODEL, contents=contents, config=config
+                    )
+                    for chunk in stream:
+                        last_chunk = chunk
+                        piece = chunk.text or ""
+                        if not piece:
+                            continue
+                        if not text:
+                            telemetry.LLM_FIRST_TOKEN.labels(role).observe(time.perf_counter() - started)
+                        text += piece
+                        sentences, pending = pop_sentences(pending + piece)
+                        for sentence in sentences:
+                            on_delta(sentence)
+                completed = True
+            except Exception as e:
+                print(f"⚠️ Streaming Error: {e}")
+            if completed and pending.strip():
+                on_delta(pending.strip())
+
+        # A stream that broke off is not a question; the fallback call's text replaces the deltas
+        if not text or not completed:
+            telemetry.LLM_ERRORS.labels(role).inc()
+            return None
+        if last_chunk is not None:
+            # usage_metadata is complete on the final chunk
+            self._record_usage(role, last_chunk)
+        return text.strip()
+
+    def _send_to_webhook(self):
         # 🔥 SEND TO WEBHOOK (Brain Speaks)
         try:
+            import requests
             webhook_payload = {"text": self.current_question_text}
-            requests.post(WEBHOOK_URL, json=webhook_payload)
+            with self.trace.span("webhook"), telemetry.WEBHOOK.time():
+                requests.post(WEBHOOK_URL, json=webhook_payload)
         except Exception as e:
             print(f"⚠️ Webhook Error: {e}")
 
-        return self.current_question_text
-
+    @traced("evaluate_answer")
     def evaluate_answer(self, user_answer):
         prompt = f"""
         Question: "{self.current_question_text}"
         User Answer: "{user_answer}"
         Task: Check if factually correct.
         """
+        contents, config = self.prompt_cache.build("grader", prompt, llm_replay.content_config(
+            response_mime_type="application/json",
+            response_schema=AnswerGrade
+        ))
         response = self._safe_api_call(
-            client_instance=client_grader,
-            model="gemini-flash-latest",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                response_schema=AnswerGrade
-            )
+            role="grader",
+            model=LLM_MODEL,
+            contents=contents,
+            config=config
         )
         
         is_correct = True
@@ -177,6 +422,10 @@ class AdaptiveInterviewer:
             except:
                 pass
 
+        return self._apply_grade(is_correct)
+
+    def _apply_grade(self, is_correct):
+        self.prompt_cache.record_turn(self.topics[self.current_topic_index], self.difficulty_level, is_correct)
         self.questions_asked_in_current_topic += 1
         
         if is_correct:
@@ -195,6 +444,79 @@ class AdaptiveInterviewer:
             
         return "CONTINUE"
 
+    def _next_turn_after(self, is_correct):
+        """(topic, difficulty, question count) the next question gets for this grade, or None if the interview ends."""
+        asked = self.questions_asked_in_current_topic + 1
+        correct = self.correct_answers_in_current_topic + (1 if is_correct else 0)
+        if correct >= 3 or asked >= 5:
+            next_index = self.current_topic_index + 1
+            if next_index >= len(self.topics):
+                return None
+            return self.topics[next_index], 2, 1
+        if is_correct:
+            difficulty = min(3, self.difficulty_level + 1)
+        else:
+            difficulty = max(1, self.difficulty_level - 1)
+        return self.topics[self.current_topic_index], difficulty, asked + 1
+
+    @traced("grade_and_ask")
+    def grade_and_ask(self, user_answer):
+        """
+        Grades the answer and writes the next question in ONE Gemini call.
+        Both possible next turns (correct / wrong) are worked out here and given to the model.
+        Returns (status, next_question); next_question is None once the interview is over.
+        Falls back to evaluate_answer() + generate_question() if the combined call fails.
+        """
+        branches = {grade: self._next_turn_after(grade) for grade in (True, False)}
+
+        def rule(branch):
+            if branch is None:
+                return 'the interview is over: next_question = ""'
+            topic, difficulty, count = branch
+            return f"ask ONE direct question about {topic}, difficulty {difficulty}/3 (1=Easy, 3=Hard), question #{count} on this topic"
+
+        prompt = f"""
+        Question: "{self.current_question_text}"
+        User Answer: "{user_answer}"
+        {self._resume_context(self.topics[self.current_topic_index])}
+        TASK:
+        1. Check if the answer is factually correct.
+        2. Write the next question. STRICTLY 1 or 2 sentences max.
+           - If correct: {rule(branches[True])}.
+           - If wrong: {rule(branches[False])}.
+        """
+        contents, config = self.prompt_cache.build("grader", prompt, llm_replay.content_config(
+            response_mime_type="application/json",
+            response_schema=GradedTurn
+        ), with_summary=True)
+        response = self._safe_api_call(
+            role="grader",
+            model=LLM_MODEL,
+            contents=contents,
+            config=config
+        )
+
+        try:
+            turn = json.loads(response.text)
+            is_correct = bool(turn['is_correct'])
+            next_question = (turn.get('next_question') or "").strip()
+        except Exception:
+            print("   ⚠️ Combined turn failed, using separate grade + question calls.")
+            status = self.evaluate_answer(user_answer)
+            if self.current_topic_index >= len(self.topics):
+                return status, None
+            return status, self.generate_question()
+
+        status = self._apply_grade(is_correct)
+        if self.current_topic_index >= len(self.topics):
+            return status, None
+        if not next_question:
+            return status, self.generate_question()
+
+        self.current_question_text = next_question
+        self._send_to_webhook()
+        return status, self.current_question_text
+
     def _move_next_topic(self):
         print(f"   📝 Section Score Locked: {self.current_skill_score}")
         self.skill_scores.append(self.current_skill_score)
@@ -212,6 +534,7 @@ class AdaptiveInterviewer:
 # --- 4. MAIN EXECUTION ---
 def extract_text_from_pdf(pdf_path):
     try:
+        import PyPDF2
         text = ""
         with open(pdf_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
@@ -220,6 +543,10 @@ def extract_text_from_pdf(pdf_path):
     except: return "Experience with Python."
 
 if __name__ == "__main__":
+    if not keys_configured() and not llm_replay.is_replay():
+        print("❌ ERROR: Please add at least one Gemini key to your .env file (or run with LLM_MODE=replay)")
+        exit()
+
     resume_path = "brain/Alex_Taylor_Resume.pdf"
     content = extract_text_from_pdf(resume_path) if os.path.exists(resume_path) else "Python Skills"
 
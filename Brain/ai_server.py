@@ -1,21 +1,81 @@
 import os
 import sys
 import json
+import time
+import base64
 import asyncio
 import numpy as np
-import tempfile
-import speech_recognition as sr
-from pydub import AudioSegment
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
 import uvicorn
 
 # --- IMPORT YOUR BRAIN ---
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Shared"))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pro"))
+import Brain
 from Brain import AdaptiveInterviewer, extract_text_from_pdf
+from model_registry import registry as model_registry, get_confidence_model, preload_models, memory_usage
+from startup import StartupReport
+import telemetry
+from tracing import tracer, NULL_TRACE
+from vad import StreamingVAD, trim_silence, END_SILENCE_MS
+from session_store import create_session_store, new_session_token
+from admission import CapacityScheduler, NULL_TICKET
+from feed import FeedPublisher, feed_options
+from answer_buffer import AnswerBuffer, AnswerAudio
+from timeline import SessionTimeline, timeline_report, start_retention
+from admin import admin_allowed
+import video_session
 
 app = FastAPI()
+startup_report = StartupReport("ai_server")
+
+# How long a session waits for warm-up before it is served anyway (cold)
+READY_WAIT_SECONDS = 30
+
+# Clients that stream raw PCM ({"audioFormat": "pcm16"}) get server-side endpointing
+PCM_SAMPLE_RATE = 16000
+
+# Optional speech-to-text endpoint that replaces recognize_google (e.g. benchmarks/fake_services.py)
+STT_URL = os.getenv("STT_URL", "")
+
+# Instant first question: a canned warm-up question is asked while the Brain boots in the background.
+# Sessions can override it ({"instantStart": true/false} in the init message).
+INSTANT_START = os.getenv("INSTANT_START", "0") == "1"
+WARMUP_QUESTIONS = [
+    "To get started, tell me a bit about yourself and what drew you to the {role} role.",
+    "Before we dive in, walk me through a recent project you are proud of and your part in it.",
+    "Let's warm up: what does a productive working day look like for you as a {role}?",
+]
+
+def warmup_question(job_desc):
+    role = (job_desc or "Software Engineer").strip().splitlines()[0][:60] or "Software Engineer"
+    return WARMUP_QUESTIONS[sum(map(ord, role)) % len(WARMUP_QUESTIONS)].format(role=role)
+
+# Build the Holistic graph during warm-up so the first gateway (/ws/session) frame is not cold
+WARM_GATEWAY_VIDEO = os.getenv("WARM_GATEWAY_VIDEO", "1") == "1"
+
+# Admission control. Budget = worker threads for STT / Gemini (asyncio.to_thread's default pool);
+# a session costs AUDIO_SESSION_COST on average plus one worker while a turn is in flight.
+# Gateway video has its own budget: the share of the single gateway-video thread it may use.
+AI_SERVER_CAPACITY = float(os.getenv("AI_SERVER_CAPACITY", str(min(32, (os.cpu_count() or 1) + 4))))
+AUDIO_SESSION_COST = float(os.getenv("AUDIO_SESSION_COST", "0.25"))
+GATEWAY_VIDEO_CAPACITY = float(os.getenv("GATEWAY_VIDEO_CAPACITY", "0.8"))
+scheduler = CapacityScheduler("ai_server", AI_SERVER_CAPACITY)
+video_scheduler = CapacityScheduler("gateway_video", GATEWAY_VIDEO_CAPACITY)
+
+# Interview state survives disconnects (and is visible to every worker with a shared SESSION_STORE)
+session_store = create_session_store()
+
+# PRELOAD_MODELS=1 loads the confidence model at import. Under gunicorn --preload
+# (-k uvicorn.workers.UvicornWorker) that happens once in the master, and the forked workers
+# share its pages instead of each loading a private copy (see Shared/model_registry.py)
+if os.getenv("PRELOAD_MODELS", "0") == "1":
+    preload_models()
 
 # --- CORS ---
 app.add_middleware(
@@ -26,58 +86,90 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- HELPER: ROBUST TRANSCRIPTION ---
-def transcribe_audio_bytes(audio_bytes):
+# --- HELPER: DECODE ---
+def decode_audio_bytes(audio_bytes):
     """
-    Converts WebM bytes -> WAV -> Text.
-    Returns None if audio is corrupt/empty, forcing the main loop to simulate.
+    Decodes WebM (or anything ffmpeg reads) -> mono int16 samples + sample rate.
+    Returns None if audio is corrupt/empty.
     """
-    if not audio_bytes or len(audio_bytes) < 100:
+    return decode_answer_audio(AnswerAudio(data=audio_bytes))
+
+def decode_answer_audio(answer):
+    """Same as decode_audio_bytes for an AnswerAudio; a spilled answer is decoded straight from its file."""
+    if len(answer) < 100:
         return None # Too small to be valid audio
 
-    temp_webm = None
-    wav_path = None
-    
-    try:
-        # 1. Write bytes to temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as f:
-            f.write(audio_bytes)
-            temp_webm = f.name
-        
-        # 2. Define Output Path
-        wav_path = temp_webm.replace(".webm", ".wav")
-        
-        # 3. Convert (Critical Step)
+    from pydub import AudioSegment
+
+    with answer.as_file(suffix=".webm") as path:
         try:
             # We assume input is WebM. If it fails, we return None gracefully.
-            audio = AudioSegment.from_file(temp_webm)
-            audio.export(wav_path, format="wav")
+            audio = AudioSegment.from_file(path)
         except Exception:
             # This catches the "Invalid data found" error from FFmpeg
             return None
 
-        # 4. Transcribe
+    audio = audio.set_channels(1).set_sample_width(2)
+    return np.frombuffer(audio.raw_data, dtype=np.int16), audio.frame_rate
+
+# --- HELPER: ROBUST TRANSCRIPTION ---
+def transcribe_samples(samples, sample_rate):
+    """Trims leading/trailing silence with the VAD and sends only the speech to STT."""
+    import speech_recognition as sr
+
+    speech = trim_silence(samples, sample_rate)
+    if len(speech) == 0:
+        return None
+
+    audio_data = sr.AudioData(speech.astype(np.int16, copy=False).tobytes(), sample_rate, 2)
+    with telemetry.STT.time():
+        if STT_URL:
+            return recognize_via_url(audio_data)
         recognizer = sr.Recognizer()
-        with sr.AudioFile(wav_path) as source:
-            audio_data = recognizer.record(source)
-            try:
-                text = recognizer.recognize_google(audio_data)
-                return text
-            except (sr.UnknownValueError, sr.RequestError):
+        try:
+            return recognizer.recognize_google(audio_data)
+        except (sr.UnknownValueError, sr.RequestError):
+            return None
+
+def recognize_via_url(audio_data):
+    """POSTs the answer as WAV to STT_URL and expects {"text": "..."} back."""
+    import requests
+    try:
+        response = requests.post(STT_URL, data=audio_data.get_wav_data(),
+                                 headers={"Content-Type": "audio/wav"}, timeout=30)
+        response.raise_for_status()
+        return response.json().get("text") or None
+    except Exception as e:
+        print(f"⚠️ STT Error: {e}")
+        return None
+
+def transcribe_audio_bytes(audio_bytes, audio_format="webm", sample_rate=None):
+    """
+    Converts WebM bytes (or raw pcm16 when audio_format="pcm16") -> samples -> Text.
+    Returns None if audio is corrupt/empty, forcing the main loop to simulate.
+    """
+    return transcribe_answer(AnswerAudio(data=audio_bytes or b""), audio_format, sample_rate)
+
+def transcribe_answer(answer, audio_format="webm", sample_rate=None):
+    """transcribe_audio_bytes for an AnswerAudio (in memory or spilled to disk), read without copying."""
+    try:
+        if audio_format == "pcm16":
+            if len(answer) < 100:
+                return None
+            samples = answer.as_array(np.int16)
+            rate = sample_rate or PCM_SAMPLE_RATE
+        else:
+            with telemetry.AUDIO_DECODE.time():
+                decoded = decode_answer_audio(answer)
+            if decoded is None:
                 return None
+            samples, rate = decoded
+
+        return transcribe_samples(samples, rate)
 
     except Exception as e:
         print(f"❌ Transcription Critical Error: {e}")
         return None
-        
-    finally:
-        # Cleanup temp files safely
-        if temp_webm and os.path.exists(temp_webm):
-            try: os.remove(temp_webm)
-            except: pass
-        if wav_path and os.path.exists(wav_path):
-            try: os.remove(wav_path)
-            except: pass
 
 # --- HELPER: Clean Repetitive Stuttering ---
 def clean_stutter(text):
@@ -91,32 +183,178 @@ def clean_stutter(text):
         cleaned.append(word)
     return " ".join(cleaned)
 
-# --- WEBSOCKET ENDPOINT (FINAL STABLE VERSION) ---
-@app.websocket("/ws/audio")
-async def audio_websocket(websocket: WebSocket):
-    await websocket.accept()
-    print("✅ React Client Connected")
-    
-    bot = None
-    audio_buffer = bytearray()
-    last_question = "" 
-    
-    # Suppress numpy warnings
-    import numpy as np
-    np.seterr(all='ignore') 
-    
-    try:
-        # 1. INITIALIZATION
-        init_data = await websocket.receive_text()
-        init_json = json.loads(init_data)
-        
+# --- STARTUP: BACKGROUND WARM-UP ---
+def warm_up(report):
+    """Pays every first-request cost (imports, model load, JIT) before traffic arrives."""
+    if not Brain.llm_replay.is_replay():
+        with report.stage("import google-genai"):
+            from google import genai
+            from google.genai import types
+    with report.stage("import voice"):
+        Brain.load_voice_module()
+    with report.stage("import stt (sr + pydub)"):
+        import speech_recognition
+        import pydub
+    with report.stage("load confidence model"):
+        model = get_confidence_model()
+    with report.stage("dummy inference"):
+        if model is not None:
+            model.predict_proba([[0.0] * 8])
+        import librosa
+        librosa.feature.spectral_flatness(y=np.zeros(22050, dtype=np.float32))
+    with report.stage("llm clients"):
+        if Brain.llm_replay.is_replay():
+            print(f"🎞️ LLM replay mode: {len(Brain.llm_replay.store)} recorded responses, no Gemini calls.")
+        elif Brain.keys_configured():
+            Brain.get_pool().warm_up()
+        else:
+            print("⚠️ Gemini keys missing: LLM calls will fall back to canned answers.")
+    if WARM_GATEWAY_VIDEO:
+        with report.stage("vision (gateway)"):
+            try:
+                video_session.get_holistic()
+            except ImportError as e:
+                print(f"⚠️ Vision stack unavailable, /ws/session video disabled until installed: {e}")
+
+@app.on_event("startup")
+async def start_warm_up():
+    startup_report.start_warmup(warm_up)
+    start_retention()
+
+@app.get("/ready")
+async def ready():
+    # Readiness probe: 503 until warm-up has finished, so the balancer holds traffic back
+    status = 200 if startup_report.is_ready else 503
+    return JSONResponse(startup_report.as_dict(), status_code=status)
+
+# --- INTERVIEW SESSION ---
+def decode_chunk(raw_data):
+    """{"bytes": ...} payload (list of ints or base64 text) -> raw bytes."""
+    if isinstance(raw_data, list):
+        return bytes(raw_data)
+    if isinstance(raw_data, str):
+        try:
+            return base64.b64decode(raw_data)
+        except:
+            pass
+    return b""
+
+class InterviewSession:
+    """
+    One candidate's interview: answer buffer, live confidence feed, VAD, grading and question flow.
+    Messages go out through the async send(payload) callback, so the same logic serves
+    /ws/audio (JSON) and the multiplexed gateway (/ws/session).
+    Gemini / STT calls run in worker threads to keep the event loop free for other traffic.
+    """
+    def __init__(self, send, trace=NULL_TRACE, ticket=NULL_TICKET, send_bytes=None):
+        self.send = send
+        self.trace = trace
+        self.ticket = ticket     # Admission ticket; turns in flight count against the server budget
+        self.feed = FeedPublisher(send, send_bytes)    # Coalesced realtime_feed messages
+        self.timeline = SessionTimeline()               # Keyed by the session token once start() knows it
+        self.connected_at = time.perf_counter()
+        self.started = False
+        self.bot = None
+        self.bootstrap = None    # Background Brain creation while the warm-up question is answered
+        self.bootstrap_args = None
+        self.first_question_sent = False
+        self.combined_turn = None
+        self.token = None
+        self.audio_buffer = AnswerBuffer(suffix=".webm")    # Bounded; long answers spill to disk
+        self.answer_capped = False
+        self.last_question = ""
+        self.audio_format = "webm"
+        self.sample_rate = PCM_SAMPLE_RATE
+        self.vad = None
+        # {"streamQuestions": true}: question text arrives as question_delta sentences before "question"
+        # (a question_reset before "question" means the deltas were not the final question: drop them)
+        self.stream_questions = False
+        self.streamed = False
+        self.streamed_parts = []    # question_delta texts of the current question
+
+        # Collected for the fused final report
+        self.feed_sum = 0.0
+        self.feed_count = 0
+        self.answer_scores = []
+
+    def save(self):
+        if self.bot is None:
+            return    # Still bootstrapping; nothing worth restoring yet
+        with self.trace.span("save_session"):
+            session_store.put(self.token, {"bot": self.bot.to_state(), "last_question": self.last_question})
+
+    async def start(self, init_json):
+        """Init message -> new (or resumed) interview, ending with the first question sent."""
+        self.started = True
         resume_text = init_json.get("resumeText", "")
         if not resume_text and os.path.exists("Alex_Taylor_Resume.pdf"):
             resume_text = extract_text_from_pdf("Alex_Taylor_Resume.pdf")
-            
-        print("🧠 Initializing The Brain...")
+
+        # Raw PCM can be analysed live, so those clients get automatic end-of-answer detection.
+        # WebM/Opus chunks are compressed; they keep STOP_ANSWER and only get silence trimming.
+        self.audio_format = init_json.get("audioFormat", "webm")
+        self.stream_questions = bool(init_json.get("streamQuestions", False))
+        self.combined_turn = init_json.get("combinedTurn")
+        self.feed.configure(**feed_options(init_json))
+        if self.audio_format == "pcm16":
+            self.sample_rate = int(init_json.get("sampleRate", PCM_SAMPLE_RATE))
+            self.audio_buffer = AnswerBuffer(bytes_per_second=self.sample_rate * 2, suffix=".pcm")
+            self.vad = StreamingVAD(self.sample_rate, end_silence_ms=int(init_json.get("endpointMs", END_SILENCE_MS)))
+
+        # Reconnect: a known session token continues the interview instead of starting over
+        self.token = init_json.get("sessionToken")
+        saved = session_store.get(self.token) if self.token else None
+        if saved:
+            try:
+                with self.trace.span("restore_session"):
+                    self.bot = AdaptiveInterviewer.from_state(saved["bot"], trace=self.trace)
+                self.last_question = saved.get("last_question", "")
+            except (KeyError, ValueError) as e:
+                print(f"⚠️ Could not restore session: {e}")
+                self.bot = None
+
+        if self.bot:
+            print("🔁 Session Resumed.")
+            self.timeline = SessionTimeline(self.token)
+            self._apply_options()
+            await self.send({"type": "session", "token": self.token, "resumed": True})
+            # Repeat the question the candidate was answering when the connection dropped
+            await self.send_question(self.last_question, "resumed", resumed=True)
+            return
+
+        self.token = new_session_token()
+        self.timeline = SessionTimeline(self.token)
+        await self.send({"type": "session", "token": self.token, "resumed": False})
         job_desc = init_json.get("jobDescription", "Software Engineer")
-        bot = AdaptiveInterviewer(resume_text, job_desc)
+
+        if init_json.get("instantStart", INSTANT_START):
+            # Warm-up question right away; the Brain (voice init + topic call) and the first
+            # adaptive question are prepared while the candidate answers it
+            self.bootstrap_args = (resume_text, job_desc)
+            self.bootstrap = asyncio.ensure_future(self._bootstrap(resume_text, job_desc))
+            self.last_question = warmup_question(job_desc)
+            await self.send_question(self.last_question, "warmup")
+            return
+
+        await self._create_bot(resume_text, job_desc)
+
+        # 2. FIRST QUESTION
+        with self.ticket.work():
+            first_q = await self.generate_question()
+        self.last_question = first_q
+        self.save()
+        await self.send_question(first_q, "adaptive")
+
+    async def _bootstrap(self, resume_text, job_desc):
+        """Background half of an instant start: the Brain, then its first question (not announced yet)."""
+        await self._create_bot(resume_text, job_desc)
+        with self.trace.span("prepare_first_question"), self.ticket.work():
+            return await asyncio.to_thread(self.bot.generate_question, None, False)
+
+    async def _create_bot(self, resume_text, job_desc):
+        print("🧠 Initializing The Brain...")
+        with self.trace.span("init_interviewer"), self.ticket.work():
+            bot = await asyncio.to_thread(AdaptiveInterviewer, resume_text, job_desc, trace=self.trace)
         
         # >>> FIX 1: ENSURE TOPICS EXIST <<<
         # If the resume parser failed or found too few topics, add defaults.
@@ -124,22 +362,337 @@ async def audio_websocket(websocket: WebSocket):
             print("⚠️ Not enough topics found. Adding defaults.")
             bot.topics.extend(["System Design", "Problem Solving", "Communication"])
 
-        # 2. FIRST QUESTION
-        first_q = bot.generate_question()
-        last_question = first_q
-        await websocket.send_json({
+        self.bot = bot
+        self._apply_options()
+
+    def _apply_options(self):
+        if self.combined_turn is not None:
+            self.bot.combined_turn = bool(self.combined_turn)
+
+    async def on_audio_chunk(self, new_chunk):
+        """Buffers a chunk and sends the live feed. Returns True when the answer should be processed now
+        (the VAD detected its end, or a pcm16 answer reached the length cap)."""
+        appended = self.audio_buffer.append(new_chunk)
+        if self.audio_buffer.full and not self.answer_capped:
+            self.answer_capped = True
+            self.trace.event("answer_cap", bytes=len(self.audio_buffer))
+            if self.audio_format == "pcm16":
+                print("✂️ Answer reached the length cap, processing it now.")
+                return True
+            # Only the first chunk of a WebM recording has the header, so the stream cannot be cut
+            # here: the rest of this answer is dropped until the client sends STOP_ANSWER
+            print("✂️ Answer reached the length cap, dropping audio until STOP_ANSWER.")
+            await self.send({"type": "answer_cap"})
+        if not appended or self.answer_capped:
+            return False
+        
+        # Audio Confidence Calculation
+        if len(new_chunk) % 2 == 0:
+            np_data = np.frombuffer(new_chunk, dtype=np.int16)
+            if len(np_data) > 0:
+                mean_sq = np.mean(np_data**2)
+                if np.isnan(mean_sq) or mean_sq < 0:
+                    vol = 0
+                else:
+                    vol = np.sqrt(mean_sq)
+                
+                conf = min(vol / 100 * 100, 100)
+                # Same rule as the frontend: pauses (score <= 5) do not drag the average down
+                if conf > 5:
+                    self.feed_sum += conf
+                    self.feed_count += 1
+                self.timeline.append("audio", confidence=conf)
+                
+                await self.feed.publish({
+                    "type": "realtime_feed", 
+                    "audioConfidence": float(conf)
+                })
+
+        # Streaming VAD: speech/non-speech events + automatic endpointing
+        if self.vad:
+            usable = len(new_chunk) - (len(new_chunk) % 2)
+            events = self.vad.process(np.frombuffer(new_chunk, dtype=np.int16, count=usable // 2))
+            for event in events:
+                await self.send({"type": "vad", **event})
+            if any(event["event"] == "endpoint" for event in events):
+                self.trace.event("endpoint")
+                return True
+        return False
+
+    async def process_answer(self):
+        """Transcribe -> grade -> next question. Returns True when the interview is over."""
+        if self.bootstrap is not None:
+            with self.ticket.work():
+                return await self._warmup_turn()
+        with self.trace.span("answer_turn"), self.ticket.work():
+            finished = await self._answer_turn()
+        if finished:
+            session_store.delete(self.token)
+            await asyncio.to_thread(self.bot.prompt_cache.close)
+        else:
+            self.save()
+        return finished
+
+    def _take_answer_audio(self):
+        # Hand the buffered answer over (no copy) and start a fresh one immediately
+        answer = self.audio_buffer.take()
+        self.answer_capped = False
+        if self.vad:
+            self.vad.reset()
+        return answer
+
+    def discard_answer(self):
+        # Drops buffered audio, including a spill file on disk
+        self._take_answer_audio().close()
+
+    async def _transcribe(self, answer):
+        # Silence is trimmed before STT
+        with self.trace.span("transcription", bytes=len(answer)):
+            try:
+                user_text = await asyncio.to_thread(
+                    transcribe_answer, answer, self.audio_format, self.sample_rate
+                )
+            finally:
+                answer.close()
+        # >>> FIX 2: CLEAN REPETITION <<<
+        return clean_stutter(user_text)
+
+    async def _warmup_turn(self):
+        """Warm-up answer: not graded; hands over to the first adaptive question once the Brain is ready.
+        Returns True (interview over) if the Brain cannot be created."""
+        print("🛑 Processing Warm-up Answer...")
+        self.streamed = False
+        with self.trace.span("warmup_turn"):
+            transcription = asyncio.ensure_future(self._transcribe(self._take_answer_audio()))
+            first_q = None
+            with self.trace.span("wait_bootstrap"):
+                try:
+                    first_q = await self.bootstrap
+                except Exception as e:
+                    print(f"⚠️ Background init failed, retrying inline: {e}")
+                    try:
+                        if self.bot is None:
+                            await self._create_bot(*self.bootstrap_args)
+                    except Exception as e:
+                        print(f"🔥 Could not initialize the interview: {e}")
+                        transcription.cancel()
+                        await asyncio.gather(transcription, return_exceptions=True)
+                        await self.send({"type": "end", "text": "Could not start the interview. Please try again.", "error": True})
+                        return True
+                finally:
+                    self.bootstrap = None
+
+            user_text = await transcription
+            if user_text:
+                await self.send({"user_transcription": user_text})
+
+            if first_q:
+                # Prepared during the warm-up answer: only the webhook is left
+                await asyncio.to_thread(self.bot.announce_question)
+            else:
+                first_q = await self.generate_question()
+            self.last_question = first_q
+            self.save()
+            await self.send_question(first_q, "adaptive")
+        return False
+
+    async def _answer_turn(self):
+        bot = self.bot
+        self.streamed = False
+        print("🛑 Processing Answer...")
+        answer_s = self.audio_buffer.duration
+        
+        # 1. Transcribe
+        user_text = await self._transcribe(self._take_answer_audio())
+        grade_started = time.perf_counter()
+
+        if not user_text or len(user_text.strip()) < 5:
+            print("⚠️ Audio invalid/empty. Using Simulation.")
+            user_text = "I have experience with this skill and have used it in projects."
+        
+        print(f"   🗣️ User said: {user_text}")
+
+        # 2. Grade (combined mode also writes the next question in the same Gemini call)
+        next_q = None
+        if bot.combined_turn:
+            status, next_q = await asyncio.to_thread(bot.grade_and_ask, user_text)
+        else:
+            status = await asyncio.to_thread(bot.evaluate_answer, user_text)
+        answer_score = 85 if "Correct" in str(status) or bot.correct_answers_in_current_topic > 0 else 40
+        self.answer_scores.append(answer_score)
+        self.timeline.append("answers", answer_s=answer_s, score=answer_score,
+                             grade_ms=(time.perf_counter() - grade_started) * 1000)
+        
+        # 3. Send Feedback
+        await self.send({
+            "user_transcription": user_text,
+            "scores": {
+                "answer_score": answer_score
+            }
+        })
+
+        # 4. Next Question Logic
+        await asyncio.sleep(0.5)
+        
+        # Check if we are truly done
+        if bot.current_topic_index >= len(bot.topics):
+            print("🏁 Interview Finished.")
+            await self.send({"type": "end", "text": "Interview Complete!"})
+            # Give frontend time to receive message before closing
+            await asyncio.sleep(1) 
+            return True
+        
+        if next_q is None:
+            next_q = await self.generate_question()
+        
+        # >>> FIX 3: PREVENT STUCK BOT <<<
+        if next_q == self.last_question:
+            print("⚠️ Bot stuck. Moving to next topic manually.")
+            bot.current_topic_index += 1
+            
+            # Check if we ran out of topics after incrementing
+            if bot.current_topic_index >= len(bot.topics):
+                await self.send({"type": "end", "text": "Interview Complete!"})
+                await asyncio.sleep(1)
+                return True
+            
+            next_topic = bot.topics[bot.current_topic_index]
+            next_q = f"Let's move on. Please tell me about your experience with {next_topic}."
+        
+        self.last_question = next_q
+
+        await self.send_question(next_q)
+        return False
+
+    async def generate_question(self):
+        """bot.generate_question() in a worker thread, forwarding streamed sentences as question_delta."""
+        self.streamed = False
+        self.streamed_parts = []
+        if not self.stream_questions:
+            return await asyncio.to_thread(self.bot.generate_question)
+
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+
+        def on_delta(text):
+            # Called from the worker thread
+            loop.call_soon_threadsafe(deltas.put_nowait, text)
+
+        async def forward(text):
+            await self.send({"type": "question_delta", "text": text})
+            self.streamed = True
+            self.streamed_parts.append(text)
+
+        task = asyncio.ensure_future(asyncio.to_thread(self.bot.generate_question, on_delta))
+        while not task.done():
+            getter = asyncio.ensure_future(deltas.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await forward(getter.result())
+            else:
+                getter.cancel()
+        while not deltas.empty():
+            await forward(deltas.get_nowait())
+        return task.result()
+
+    async def send_question(self, text, mode="adaptive", **extra):
+        if not self.first_question_sent:
+            self.first_question_sent = True
+            telemetry.TIME_TO_FIRST_QUESTION.labels(mode).observe(time.perf_counter() - self.connected_at)
+        # The final message always carries the full text; it is only spoken if nothing was streamed.
+        # If the streamed text is not this question (the stream broke off and the fallback call
+        # answered, or FIX 3 replaced a repeated question) clients drop the deltas and speak this one.
+        replaced = self.streamed and " ".join(self.streamed_parts).split() != text.split()
+        if replaced:
+            await self.send({"type": "question_reset"})
+        await self.send({
             "type": "question",
-            "text": first_q,
-            "speak": True
+            "text": text,
+            "speak": not self.streamed or replaced,
+            **extra
         })
+        self.streamed = False
+        self.streamed_parts = []
+
+    def close(self):
+        """Connection gone: stops a pending Brain bootstrap, drops unprocessed audio, flushes the feed / timeline."""
+        if self.bootstrap is not None:
+            self.bootstrap.cancel()    # The worker thread finishes on its own; its Brain is dropped
+            self.bootstrap = None
+        self.discard_answer()
+        self.feed.close()
+        self.timeline.close()
+
+    def report(self):
+        """Audio + answer side of the fused final report."""
+        bot = self.bot
+        return {
+            "session": self.token,
+            "audioConfidence": round(self.feed_sum / self.feed_count) if self.feed_count else 0,
+            "answerQuality": round(float(np.mean(self.answer_scores))) if self.answer_scores else 0,
+            "answers": len(self.answer_scores),
+            "topics": list(bot.topics) if bot else [],
+            "skillScores": list(bot.skill_scores) if bot else [],
+        }
+
+# --- ADMISSION ---
+async def admit_session(websocket, cost):
+    """Admits, queues (with position / ETA updates) or rejects a new session. -> Ticket or None."""
+    async def notify(payload):
+        await websocket.send_json(payload)
+
+    try:
+        ticket = await scheduler.admit(cost, notify)
+    except Exception:
+        print("🔴 Client left the queue")
+        return None
+    if ticket is None:
+        print("⛔ AI server at capacity, session rejected")
+        await websocket.send_json({"type": "rejected", "reason": "capacity", "retryAfter": scheduler.eta_s(1)})
+        await websocket.close(code=1013)
+    return ticket
+
+# --- WEBSOCKET ENDPOINT (FINAL STABLE VERSION) ---
+@app.websocket("/ws/audio")
+async def audio_websocket(websocket: WebSocket):
+    await websocket.accept()
+    print("✅ React Client Connected")
+    await startup_report.wait_ready(READY_WAIT_SECONDS)
+    ticket = await admit_session(websocket, AUDIO_SESSION_COST)
+    if ticket is None:
+        return
+    telemetry.ACTIVE_SESSIONS.labels("ai_server").inc()
+    trace = tracer.start_session()
+    if trace.sampled:
+        print(f"   🧵 Tracing session {trace.session_id}")
+    
+    # Suppress numpy warnings
+    np.seterr(all='ignore') 
+
+    async def send(payload):
+        if websocket.client_state == WebSocketState.CONNECTED:
+            with trace.span("send", type=payload.get("type", "feedback")):
+                await websocket.send_json(payload)
+
+    async def send_bytes(data):
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.send_bytes(data)
+
+    session = InterviewSession(send, trace, ticket, send_bytes)
+    
+    try:
+        # 1. INITIALIZATION + FIRST QUESTION
+        init_data = await websocket.receive_text()
+        await session.start(json.loads(init_data))
 
-        # 3. MAIN LOOP
+        # 2. MAIN LOOP
         while True:
             try:
                 if websocket.client_state == WebSocketState.DISCONNECTED:
                     break
                 
-                message = await websocket.receive()
+                with trace.span("receive"):
+                    message = await websocket.receive()
                 
                 # --- A. LIVE CONFIDENCE FEED ---
                 if "text" in message:
@@ -148,108 +701,18 @@ async def audio_websocket(websocket: WebSocket):
                         
                         # CASE 1: INCOMING AUDIO CHUNK
                         if "bytes" in data_json:
-                            raw_data = data_json["bytes"]
-                            new_chunk = b""
-
-                            if isinstance(raw_data, list):
-                                new_chunk = bytes(raw_data)
-                            elif isinstance(raw_data, str):
-                                import base64
-                                try:
-                                    new_chunk = base64.b64decode(raw_data)
-                                except:
-                                    pass 
-
-                            if new_chunk:
-                                audio_buffer.extend(new_chunk)
-                                
-                                # Audio Confidence Calculation
-                                if len(new_chunk) % 2 == 0:
-                                    np_data = np.frombuffer(new_chunk, dtype=np.int16)
-                                    if len(np_data) > 0:
-                                        mean_sq = np.mean(np_data**2)
-                                        if np.isnan(mean_sq) or mean_sq < 0:
-                                            vol = 0
-                                        else:
-                                            vol = np.sqrt(mean_sq)
-                                        
-                                        conf = min(vol / 100 * 100, 100)
-                                        
-                                        if websocket.client_state == WebSocketState.CONNECTED:
-                                            await websocket.send_json({
-                                                "type": "realtime_feed", 
-                                                "audioConfidence": float(conf)
-                                            })
+                            with trace.span("decode"):
+                                new_chunk = decode_chunk(data_json["bytes"])
+
+                            if new_chunk and await session.on_audio_chunk(new_chunk):
+                                if await session.process_answer():
+                                    break
                         
                         # CASE 2: STOP COMMAND
                         elif data_json.get("text") == "STOP_ANSWER":
-                            print("🛑 Processing Answer...")
-                            
-                            # Grab buffer and clear immediately
-                            buffer_to_process = audio_buffer[:] 
-                            audio_buffer = bytearray() 
-                            
-                            # 1. Transcribe
-                            user_text = transcribe_audio_bytes(buffer_to_process)
-                            
-                            # >>> FIX 2: CLEAN REPETITION <<<
-                            user_text = clean_stutter(user_text)
-
-                            if not user_text or len(user_text.strip()) < 5:
-                                print("⚠️ Audio invalid/empty. Using Simulation.")
-                                user_text = "I have experience with this skill and have used it in projects."
-                            
-                            print(f"   🗣️ User said: {user_text}")
-
-                            # 2. Grade
-                            status = bot.evaluate_answer(user_text)
-                            
-                            # 3. Send Feedback
-                            if websocket.client_state == WebSocketState.CONNECTED:
-                                await websocket.send_json({
-                                    "user_transcription": user_text,
-                                    "scores": {
-                                        "answer_score": 85 if "Correct" in str(status) or bot.correct_answers_in_current_topic > 0 else 40
-                                    }
-                                })
-
-                            # 4. Next Question Logic
-                            await asyncio.sleep(0.5)
-                            
-                            # Check if we are truly done
-                            if bot.current_topic_index >= len(bot.topics):
-                                print("🏁 Interview Finished.")
-                                if websocket.client_state == WebSocketState.CONNECTED:
-                                    await websocket.send_json({"type": "end", "text": "Interview Complete!"})
-                                # Give frontend time to receive message before closing
-                                await asyncio.sleep(1) 
+                            trace.event("stop_answer")
+                            if await session.process_answer():
                                 break
-                            
-                            next_q = bot.generate_question()
-                            
-                            # >>> FIX 3: PREVENT STUCK BOT <<<
-                            if next_q == last_question:
-                                print("⚠️ Bot stuck. Moving to next topic manually.")
-                                bot.current_topic_index += 1
-                                
-                                # Check if we ran out of topics after incrementing
-                                if bot.current_topic_index >= len(bot.topics):
-                                    if websocket.client_state == WebSocketState.CONNECTED:
-                                        await websocket.send_json({"type": "end", "text": "Interview Complete!"})
-                                    await asyncio.sleep(1)
-                                    break
-                                
-                                next_topic = bot.topics[bot.current_topic_index]
-                                next_q = f"Let's move on. Please tell me about your experience with {next_topic}."
-                            
-                            last_question = next_q
-
-                            if websocket.client_state == WebSocketState.CONNECTED:
-                                await websocket.send_json({
-                                    "type": "question",
-                                    "text": next_q,
-                                    "speak": True
-                                })
 
                     except json.JSONDecodeError:
                         pass 
@@ -259,11 +722,212 @@ async def audio_websocket(websocket: WebSocket):
                 break
             except Exception as e:
                 print(f"⚠️ Loop Error: {e}")
-                audio_buffer = bytearray()
+                session.discard_answer()
                 
     except Exception as e:
         print(f"🔥 Critical Error: {e}")
-        
+    finally:
+        session.close()
+        ticket.release()
+        telemetry.ACTIVE_SESSIONS.labels("ai_server").dec()
+
+# --- MULTIPLEXED GATEWAY ---
+# One socket per candidate instead of two (video server /ws + /ws/audio). Binary messages start with a
+# one-byte channel id; text messages are treated as control. Replies are the JSON messages both
+# servers already send, and the session ends with one fused final_report (video + audio + answers).
+CHANNEL_VIDEO = 0x01     # raw JPEG bytes (no base64 / data-URL wrapping)
+CHANNEL_AUDIO = 0x02     # audio chunk, webm or pcm16 as announced in the init message
+CHANNEL_CONTROL = 0x03   # UTF-8 JSON: init message, {"text": "STOP_ANSWER"}, {"text": "STOP"}
+
+# Holistic keeps one shared graph per process, so frames go through a single worker thread
+video_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gateway-video")
+
+def process_video_frame(video, jpeg_bytes):
+    """Runs in video_executor: JPEG bytes -> realtime message, or None if undecodable."""
+    video_session.load_vision()
+    started = time.perf_counter()
+    try:
+        with telemetry.FRAME_DECODE.time():
+            frame = video_session.decode_jpeg(jpeg_bytes)
+    except Exception:
+        frame = None
+    if frame is None:
+        telemetry.DROPPED_FRAMES.labels("decode_error").inc()
+        return None
+    response = video.process_frame(frame)
+    video_session.record_frame_seconds(time.perf_counter() - started)
+    return response
+
+def fused_report(interview, video):
+    # Video keys stay top-level so the existing final_report handling keeps working
+    report = video.final_report()
+    report.update(interview.report())
+    return report
+
+@app.websocket("/ws/session")
+async def gateway_websocket(websocket: WebSocket):
+    await websocket.accept()
+    print("✅ Gateway Client Connected")
+    await startup_report.wait_ready(READY_WAIT_SECONDS)
+    ticket = await admit_session(websocket, AUDIO_SESSION_COST)
+    if ticket is None:
+        return
+    # Video degrades instead of blocking the interview: it is always granted and sampled more sparsely under load
+    video_ticket = video_scheduler.grant(video_session.estimated_cost(stride=video_scheduler.sample_stride()),
+                                         video_session.estimated_cost())
+    telemetry.ACTIVE_SESSIONS.labels("gateway").inc()
+    trace = tracer.start_session()
+    if trace.sampled:
+        print(f"   🧵 Tracing session {trace.session_id}")
+
+    np.seterr(all='ignore')
+    loop = asyncio.get_running_loop()
+    send_lock = asyncio.Lock()
+    closed = False
+
+    async def send(payload):
+        # Video, audio and answer tasks share the socket
+        if websocket.client_state == WebSocketState.CONNECTED and not closed:
+            with trace.span("send", type=payload.get("type", "feedback")):
+                async with send_lock:
+                    await websocket.send_json(payload)
+
+    async def send_bytes(data):
+        if websocket.client_state == WebSocketState.CONNECTED and not closed:
+            async with send_lock:
+                await websocket.send_bytes(data)
+
+    interview = InterviewSession(send, trace, ticket, send_bytes)
+    video = video_session.VideoSession()
+    video_feed = FeedPublisher(send, send_bytes)
+    video_task = None
+    turn_task = None
+
+    async def handle_frame(jpeg_bytes):
+        with trace.span("video_frame"):
+            response = await loop.run_in_executor(video_executor, process_video_frame, video, jpeg_bytes)
+        video_ticket.update(video.cost(), video.demand())
+        if response is not None:
+            if video.last_sample:
+                interview.timeline.append("video", **{k: response[k] for k in ("attention", "stability", "smoothness", "confidence")})
+            await video_feed.publish(response)
+
+    async def finish():
+        nonlocal closed
+        if video_task and not video_task.done():
+            await video_task
+        video_feed.close()
+        interview.feed.close()
+        await send(fused_report(interview, video))
+        closed = True
+        await websocket.close()
+
+    async def run_turn(coro):
+        # Init and answers run beside the receive loop so video keeps flowing during LLM calls
+        try:
+            if await coro:
+                await finish()
+        except Exception as e:
+            print(f"⚠️ Turn Error: {e}")
+            interview.discard_answer()
+
+    try:
+        while not closed:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                print("❌ Gateway Client Disconnected")
+                break
+
+            if message.get("bytes"):
+                data = message["bytes"]
+                channel, payload = data[0], data[1:]
+            elif message.get("text") is not None:
+                channel, payload = CHANNEL_CONTROL, message["text"]
+            else:
+                continue
+
+            # --- VIDEO: newest frame wins; frames arriving mid-inference are dropped ---
+            if channel == CHANNEL_VIDEO:
+                telemetry.FRAMES.inc()
+                stride = video_scheduler.sample_stride()
+                if stride != video.stride:
+                    await send({"type": "throttle", "fps": round(video.fps() / stride, 1)})
+                if not video.sample(stride):
+                    telemetry.DROPPED_FRAMES.labels("shed").inc()
+                    continue
+                if video_task and not video_task.done():
+                    telemetry.DROPPED_FRAMES.labels("busy").inc()
+                    continue
+                video_task = asyncio.create_task(handle_frame(payload))
+
+            # --- AUDIO ---
+            elif channel == CHANNEL_AUDIO:
+                if not interview.started or not payload:
+                    continue
+                endpoint = await interview.on_audio_chunk(payload)
+                if endpoint and (turn_task is None or turn_task.done()):
+                    turn_task = asyncio.create_task(run_turn(interview.process_answer()))
+
+            # --- CONTROL ---
+            elif channel == CHANNEL_CONTROL:
+                try:
+                    control = json.loads(payload)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                busy = turn_task is not None and not turn_task.done()
+
+                if control.get("text") == "STOP":
+                    print("🛑 End of Interview Detected. Generating Report...")
+                    if busy:
+                        await turn_task
+                    if not closed:
+                        await finish()
+                elif control.get("text") == "STOP_ANSWER":
+                    trace.event("stop_answer")
+                    if busy or not interview.started:
+                        print("⚠️ Still working on the previous turn, STOP_ANSWER ignored.")
+                        continue
+                    turn_task = asyncio.create_task(run_turn(interview.process_answer()))
+                elif not interview.started and not busy:
+                    video_feed.configure(**feed_options(control))
+                    turn_task = asyncio.create_task(run_turn(interview.start(control)))
+
+    except WebSocketDisconnect:
+        print("❌ Gateway Client Disconnected")
+    except Exception as e:
+        print(f"🔥 Critical Error: {e}")
+    finally:
+        # The client is gone: stop its turn and frame work before the ticket / timeline are released.
+        # A cancelled turn makes no further STT / Gemini calls (one already running in a worker
+        # thread finishes and its result is dropped).
+        pending = [task for task in (turn_task, video_task) if task and not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        video_feed.close()
+        interview.close()
+        ticket.release()
+        video_ticket.release()
+        telemetry.ACTIVE_SESSIONS.labels("gateway").dec()
+
+@app.get("/timeline/{session_id}")
+async def session_timeline(request: Request, session_id: str, stream: str = None, start: float = None, end: float = None, points: int = 500):
+    # Downsampled per-session metric history (see Shared/timeline.py); the session token is the key
+    if not admin_allowed(request):
+        return JSONResponse({"error": "forbidden"}, status_code=403)
+    try:
+        report = timeline_report(session_id, stream, start, end, points)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not report:
+        return JSONResponse({"error": "No timeline for this session"}, status_code=404)
+    return report
+
+@app.get("/capacity")
+async def capacity():
+    return {"sessions": scheduler.stats(), "gateway_video": video_scheduler.stats()}
+
 # --- PARSE PDF ENDPOINT ---
 @app.post("/parse-pdf")
 async def parse_pdf(file: UploadFile = File(...)):
@@ -279,5 +943,39 @@ async def parse_pdf(file: UploadFile = File(...)):
         print(f"❌ PDF Parse Error: {e}")
         return {"status": "error", "text": "Could not parse PDF"}
 
+# --- ADMIN: SESSION TRACES ---
+# Traces hold prompts and session details, so these routes go through admin_allowed (Shared/admin.py)
+@app.get("/admin/traces")
+async def list_traces(request: Request):
+    if not admin_allowed(request):
+        return JSONResponse({"error": "forbidden"}, status_code=403)
+    return {"sample_rate": tracer.sample_rate, "sessions": tracer.summary()}
+
+@app.get("/admin/llm-pool")
+async def llm_pool_stats(request: Request):
+    # Breaker state, quota left and typical latency of every Gemini key
+    if not admin_allowed(request):
+        return JSONResponse({"error": "forbidden"}, status_code=403)
+    return {"keys": Brain.get_pool().stats()}
+
+@app.get("/admin/traces/export")
+async def export_traces(request: Request, session: str = None):
+    # Load the response in chrome://tracing or ui.perfetto.dev
+    if not admin_allowed(request):
+        return JSONResponse({"error": "forbidden"}, status_code=403)
+    return tracer.export_chrome(session.split(",") if session else None)
+
+# --- METRICS ---
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(telemetry.render(), media_type=telemetry.CONTENT_TYPE)
+
+# --- MODEL REGISTRY STATS ---
+@app.get("/models")
+async def model_stats():
+    # Load time + resident size of every shared model loaded in this worker, and the worker's own
+    # RSS / PSS (PSS splits shared pages, so it shows whether preloaded models are really shared)
+    return {"models": model_registry.stats(), "process": memory_usage()}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,279 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import telemetry
+
+# Every configured Gemini key serves every role. Each request goes to the available key with the
+# best (latency x load / remaining quota) score; keys that keep failing or get throttled are taken
+# out by a circuit breaker and probed again after a cool-down. Optionally a slow request is hedged
+# on a second key and the first response wins.
+# Keys show up in metrics as key1, key2, ... never as the secret itself.
+
+# --- CONFIGURATION ---
+# Requests/minute each key may spend, counted per process (0 = no cap). The limit Google enforces is
+# per project, so with several workers or keys from one project set it to a share of that limit.
+RPM_PER_KEY = int(os.getenv("GEMINI_RPM_PER_KEY", "0"))
+HEDGE_AFTER_MS = os.getenv("LLM_HEDGE_AFTER_MS", "0")           # 0 = off, "auto" = 2x the key's usual latency
+MAX_ATTEMPTS = 3                                                # Keys tried per request
+FAILURE_THRESHOLD = 3                                           # Consecutive failures that open a breaker
+BREAKER_COOLDOWN_S = 30
+THROTTLE_COOLDOWN_S = 10                                        # A 429 takes the key out for this long
+MAX_WAIT_S = 2                                                  # Longest wait when every key is out
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+ROUTED = telemetry.counter("prepai_llm_routed_total", "Gemini requests per key", ["role", "key"])
+KEY_FAILURES = telemetry.counter("prepai_llm_key_failures_total", "Failed Gemini requests per key", ["key", "reason"])
+KEY_LATENCY = telemetry.histogram("prepai_llm_key_latency_seconds", "Successful Gemini request latency per key", ["key"])
+BREAKER_STATE = telemetry.gauge("prepai_llm_breaker_state", "Circuit breaker per key (0 closed, 1 half-open, 2 open)", ["key"])
+HEDGED = telemetry.counter("prepai_llm_hedged_total", "Requests hedged on a second key, by winner", ["role", "winner"])
+
+
+def failure_reason(error):
+    text = str(error)
+    if "429" in text or "503" in text or "RESOURCE_EXHAUSTED" in text or "UNAVAILABLE" in text:
+        return "throttled"
+    if "401" in text or "403" in text or "API_KEY_INVALID" in text or "PERMISSION_DENIED" in text:
+        return "auth"
+    if "timed out" in text.lower() or "timeout" in text.lower() or "connect" in text.lower():
+        return "network"
+    return "request"
+
+
+class KeyState:
+    def __init__(self, name, api_key, make_client):
+        self.name = name
+        self.api_key = api_key
+        self._make_client = make_client
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Guarded by the pool lock
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.recent = deque()          # Start times of requests in the last minute
+        self.latency_ewma = None
+        self.inflight = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._make_client(self.api_key)
+        return self._client
+
+    def remaining(self, now):
+        """Requests left in the current minute, or None without a cap."""
+        while self.recent and now - self.recent[0] > 60:
+            self.recent.popleft()
+        return RPM_PER_KEY - len(self.recent) if RPM_PER_KEY > 0 else None
+
+    def available(self, now):
+        if self.state == OPEN:
+            if now < self.open_until:
+                return False
+            self.state = HALF_OPEN
+            self.probing = False
+            BREAKER_STATE.labels(self.name).set(HALF_OPEN)
+        if self.state == HALF_OPEN and self.probing:
+            return False    # One probe at a time
+        remaining = self.remaining(now)
+        return remaining is None or remaining > 0
+
+
+class ClientPool:
+    def __init__(self, api_keys, make_client):
+        unique = list(dict.fromkeys(k for k in api_keys if k))
+        self.keys = [KeyState(f"key{i}", api_key, make_client) for i, api_key in enumerate(unique, 1)]
+        self._by_api_key = {key.api_key: key for key in self.keys}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def home_client(self, api_key=None):
+        """Client for a specific key (e.g. the one a context cache was created with), else the first key."""
+        if not self.keys:
+            raise RuntimeError("No Gemini keys configured")
+        return self._by_api_key.get(api_key, self.keys[0]).client
+
+    # --- ROUTING ---
+    def _score(self, key, now):
+        latency = key.latency_ewma or 1.0
+        remaining = key.remaining(now)
+        quota_left = max(remaining, 1) / RPM_PER_KEY if remaining is not None else 1.0
+        return latency * (1 + key.inflight) / quota_left
+
+    def _acquire(self, exclude=(), pinned=None):
+        """Reserves the best available key (quota + in-flight), or returns None."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [pinned] if pinned else self.keys
+            candidates = [k for k in candidates if k not in exclude and k.available(now)]
+            if not candidates:
+                return None
+            key = min(candidates, key=lambda k: self._score(k, now))
+            key.recent.append(now)
+            key.inflight += 1
+            if key.state == HALF_OPEN:
+                key.probing = True
+            return key
+
+    def _wait_for_key(self, exclude, pinned):
+        # Every key is open / out of quota: wait briefly for the first one to come back
+        deadline = time.monotonic() + MAX_WAIT_S
+        while time.monotonic() < deadline:
+            key = self._acquire(exclude, pinned)
+            if key:
+                return key
+            time.sleep(0.1)
+        return None
+
+    def _release(self, key, latency_s, error=None):
+        reason = failure_reason(error) if error is not None else None
+        with self._lock:
+            key.inflight -= 1
+            key.probing = False
+            if error is None:
+                key.failures = 0
+                key.state = CLOSED
+                key.latency_ewma = latency_s if key.latency_ewma is None else 0.8 * key.latency_ewma + 0.2 * latency_s
+            elif reason != "request":
+                # A bad request says nothing about the key; throttling, auth and network errors do
+                key.failures += 1
+                now = time.monotonic()
+                if key.state == HALF_OPEN or key.failures >= FAILURE_THRESHOLD:
+                    key.state = OPEN
+                    key.open_until = now + BREAKER_COOLDOWN_S
+                elif reason == "throttled":
+                    key.state = OPEN
+                    key.open_until = now + THROTTLE_COOLDOWN_S
+            state = key.state
+
+        BREAKER_STATE.labels(key.name).set(state)
+        if error is None:
+            KEY_LATENCY.labels(key.name).observe(latency_s)
+        else:
+            KEY_FAILURES.labels(key.name, reason).inc()
+
+    def _run(self, key, role, fn):
+        ROUTED.labels(role, key.name).inc()
+        started = time.perf_counter()
+        try:
+            result = fn(key.client)
+        except Exception as e:
+            self._release(key, time.perf_counter() - started, e)
+            raise
+        self._release(key, time.perf_counter() - started)
+        return result
+
+    # --- HEDGING ---
+    def _hedge_delay(self, key):
+        if HEDGE_AFTER_MS == "auto":
+            return 2 * key.latency_ewma if key.latency_ewma else None
+        delay_ms = float(HEDGE_AFTER_MS or 0)
+        return delay_ms / 1000 if delay_ms > 0 else None
+
+    def _hedge_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+        return self._executor
+
+    def _run_hedged(self, key, role, fn, exclude):
+        """exclude is the caller's set of failed keys; a failed hedge key is added to it."""
+        delay = self._hedge_delay(key)
+        if delay is None or len(self.keys) < 2:
+            return self._run(key, role, fn)
+
+        executor = self._hedge_executor()
+        primary = executor.submit(self._run, key, role, fn)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        backup_key = self._acquire(exclude | {key})
+        if backup_key is None:
+            return primary.result()
+
+        # The slower call cannot be cancelled; it finishes in the background and still updates its key's stats
+        backup = executor.submit(self._run, backup_key, role, fn)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    HEDGED.labels(role, "hedge" if future is backup else "primary").inc()
+                    return future.result()
+                error = future.exception()
+        exclude.add(backup_key)
+        raise error
+
+    # --- ENTRY POINTS ---
+    def call(self, role, fn, pinned_api_key=None):
+        """
+        fn(client) -> response. Tries up to MAX_ATTEMPTS keys; returns None when every attempt
+        failed or the request itself was rejected. pinned_api_key restricts the call to one key.
+        """
+        pinned = self._by_api_key.get(pinned_api_key) if pinned_api_key else None
+        tried = set()
+        for _ in range(MAX_ATTEMPTS):
+            key = self._acquire(tried, pinned) or self._wait_for_key(tried, pinned)
+            if key is None:
+                print(f"⚠️ No Gemini key available for '{role}'")
+                return None
+            try:
+                if pinned:
+                    return self._run(key, role, fn)
+                return self._run_hedged(key, role, fn, tried)
+            except Exception as e:
+                if failure_reason(e) == "request":
+                    print(f"⚠️ Gemini request rejected ({role}): {e}")
+                    return None
+                if pinned:
+                    continue    # A pinned call can only retry its own key
+                tried.add(key)
+                if len(tried) >= len(self.keys):
+                    break
+        return None
+
+    @contextmanager
+    def lease(self, role, pinned_api_key=None):
+        """Routes one streaming call: yields a client, records the outcome when the block exits."""
+        pinned = self._by_api_key.get(pinned_api_key) if pinned_api_key else None
+        key = self._acquire((), pinned) or self._wait_for_key(set(), pinned)
+        if key is None:
+            raise RuntimeError(f"No Gemini key available for '{role}'")
+        ROUTED.labels(role, key.name).inc()
+        started = time.perf_counter()
+        try:
+            yield key.client
+        except Exception as e:
+            self._release(key, time.perf_counter() - started, e)
+            raise
+        self._release(key, time.perf_counter() - started)
+
+    def warm_up(self):
+        for key in self.keys:
+            key.client
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "key": key.name,
+                    "state": STATE_NAMES[key.state],
+                    "failures": key.failures,
+                    "quota_left": key.remaining(now),
+                    "inflight": key.inflight,
+                    "latency_ms": round(key.latency_ewma * 1000, 1) if key.latency_ewma else None,
+                }
+                for key in self.keys
+            ]
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import gzip
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+
+# Record / replay for every Gemini call that goes through AdaptiveInterviewer._safe_api_call.
+#   live   - normal API calls (default)
+#   record - API calls, and each response is appended to the recordings file
+#   replay - no network and no keys: recorded responses are served back after a simulated delay;
+#            requests that were never recorded get a deterministic generated response
+# Recordings hold prompts (resume excerpts, answers), so keep them out of git.
+
+# --- CONFIGURATION ---
+LLM_MODE = os.getenv("LLM_MODE", "live")
+LLM_RECORDINGS = os.getenv(
+    "LLM_RECORDINGS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_recordings.jsonl.gz")
+)
+REPLAY_LATENCY_MS = os.getenv("LLM_REPLAY_LATENCY_MS", "")      # "" = as recorded, or a fixed delay
+REPLAY_JITTER = float(os.getenv("LLM_REPLAY_JITTER", "0.2"))     # Uniform +/- fraction on the delay
+FALLBACK_LATENCY_MS = 800                                       # Delay for generated (unrecorded) responses
+
+FALLBACK_QUESTIONS = [
+    "How have you used {topic} in a recent project, and what would you do differently?",
+    "What is a common pitfall with {topic}, and how do you avoid it?",
+    "Explain a core concept of {topic} as you would to a new teammate.",
+    "How would you debug a production issue involving {topic}?",
+]
+
+
+def is_replay():
+    return LLM_MODE == "replay"
+
+
+# --- REQUEST CONFIG ---
+class ReplayConfig(SimpleNamespace):
+    """Stands in for types.GenerateContentConfig when replaying, so replay needs no google-genai."""
+    def model_copy(self, update=None):
+        return ReplayConfig(**{**vars(self), **(update or {})})
+
+
+def content_config(**kwargs):
+    """types.GenerateContentConfig(**kwargs); a plain ReplayConfig in replay mode (same fingerprint)."""
+    if is_replay():
+        return ReplayConfig(**kwargs)
+    from google.genai import types
+    return types.GenerateContentConfig(**kwargs)
+
+
+# --- FINGERPRINT ---
+def _config_key(config):
+    if config is None:
+        return None
+    schema = getattr(config, "response_schema", None)
+    return {
+        "mime": getattr(config, "response_mime_type", None),
+        "schema": getattr(schema, "__name__", None) or (str(schema) if schema else None),
+        # cached_content names differ per session, so only an inline prefix is part of the key
+        "system": " ".join(str(getattr(config, "system_instruction", None) or "").split()) or None,
+    }
+
+
+def fingerprint(role, model, contents, config=None):
+    """Stable key for a request: whitespace-normalised prompt + model + response format."""
+    key = {
+        "role": role,
+        "model": model,
+        "contents": " ".join(str(contents).split()),
+        "config": _config_key(config),
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# --- STORE ---
+class RecordingStore:
+    """Append-only gzip JSON lines ({"fp", "text", "in", "out", "ms"}), loaded into a dict on first use."""
+    def __init__(self, path=LLM_RECORDINGS):
+        self.path = path
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        entries = {}
+        if os.path.exists(self.path):
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        entries[entry["fp"]] = entry
+        return entries
+
+    def get(self, fp):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            return self._entries.get(fp)
+
+    def put(self, entry):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            self._entries[entry["fp"]] = entry
+            # Each append is a separate gzip member; gzip readers concatenate them
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def __len__(self):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            return len(self._entries)
+
+
+store = RecordingStore()
+
+
+# --- REPLAYED RESPONSES ---
+def make_response(text, prompt_tokens=0, output_tokens=0):
+    """Quacks like a genai GenerateContentResponse for everything the Brain reads."""
+    return SimpleNamespace(
+        text=text,
+        usage_metadata=SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens),
+    )
+
+
+def _usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", None) or 0, getattr(usage, "candidates_token_count", None) or 0
+
+
+def _simulate_latency(recorded_ms):
+    delay_ms = float(REPLAY_LATENCY_MS) if REPLAY_LATENCY_MS else recorded_ms
+    if delay_ms > 0:
+        time.sleep(random.uniform(delay_ms * (1 - REPLAY_JITTER), delay_ms * (1 + REPLAY_JITTER)) / 1000)
+
+
+def _schema_fields(schema):
+    fields = getattr(schema, "model_fields", None)
+    if fields:
+        return {name: field.annotation for name, field in fields.items()}
+    return {}
+
+
+def fallback_text(contents, config, seed):
+    """Deterministic stand-in response built from the prompt and the response schema."""
+    rng = random.Random(seed)
+    match = re.search(r"(?:Topic|about):?\s*([^\n.,]+)", str(contents))
+    topic = match.group(1).strip() if match else "your main skill"
+    question = rng.choice(FALLBACK_QUESTIONS).format(topic=topic)
+
+    schema = getattr(config, "response_schema", None) if config else None
+    if schema is None:
+        return question
+
+    value = {}
+    for name, annotation in _schema_fields(schema).items():
+        if annotation is bool:
+            value[name] = rng.random() < 0.6
+        elif name == "topics":
+            value[name] = [rng.choice(["Python", "SQL", "System Design", "Data Structures"])]
+        elif "question" in name:
+            value[name] = question
+        elif annotation in (int, float):
+            value[name] = 2
+        else:
+            value[name] = "Reasonable answer with room for more detail."
+    return json.dumps(value)
+
+
+# --- ENTRY POINT ---
+def call(role, model, contents, config, live_call):
+    """live_call(role, model, contents, config) performs the real request (with retries)."""
+    if LLM_MODE == "live":
+        return live_call(role, model, contents, config)
+
+    fp = fingerprint(role, model, contents, config)
+
+    if LLM_MODE == "record":
+        started = time.perf_counter()
+        response = live_call(role, model, contents, config)
+        if response is not None and response.text:
+            prompt_tokens, output_tokens = _usage(response)
+            store.put({
+                "fp": fp,
+                "text": response.text,
+                "in": prompt_tokens,
+                "out": output_tokens,
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        return response
+
+    # replay
+    entry = store.get(fp)
+    if entry is None:
+        _simulate_latency(FALLBACK_LATENCY_MS)
+        text = fallback_text(contents, config, fp)
+        return make_response(text, len(str(contents)) // 4, len(text) // 4)
+    _simulate_latency(entry.get("ms", 0))
+    return make_response(entry["text"], entry.get("in", 0), entry.get("out", 0))
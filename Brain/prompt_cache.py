@@ -0,0 +1,117 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import llm_replay
+
+# Per-interview prompt prefix. Everything that stays the same for the whole interview (interviewer
+# instructions, job description) goes out once as the prefix; each call only carries its own turn.
+#   - Long prefixes go into a Gemini context cache (client.caches.create), one per API key / role,
+#     and requests reference it by name instead of resending it.
+#   - Short prefixes are sent as system_instruction. Keeping it first and byte-identical on every
+#     call is what lets Gemini's implicit prefix caching hit.
+# Questions also get a compact rolling summary of recent turns instead of any transcript.
+
+# --- CONFIGURATION ---
+PROMPT_CACHE = os.getenv("PROMPT_CACHE", "auto")                           # auto | off
+CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))       # Gemini rejects smaller explicit caches
+CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+SUMMARY_TURNS = 6
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text; only used to decide whether caching can apply
+    return len(text) // 4
+
+
+class PromptCache:
+    def __init__(self, prefix, get_client, model, history=None):
+        self.prefix = prefix
+        self.model = model
+        self.history = [list(turn) for turn in history or []]
+        self._get_client = get_client
+        self._names = {}   # role -> cached content name, or None once caching failed for that role
+        self._creating = {}   # role -> Future of a cache being created right now
+        self._lock = threading.Lock()
+
+    @property
+    def cacheable(self):
+        # Replay never talks to the API, and a cache name would change every request fingerprint
+        if PROMPT_CACHE == "off" or llm_replay.LLM_MODE != "live":
+            return False
+        return estimate_tokens(self.prefix) >= CACHE_MIN_TOKENS
+
+    def _cache_name(self, role):
+        if not self.cacheable:
+            return None
+        # The lock only guards the dicts: caches.create() is a network call, so it runs outside it
+        # and only callers for the same role wait for it (on its future)
+        with self._lock:
+            if role in self._names:
+                return self._names[role]
+            pending = self._creating.get(role)
+            owner = pending is None
+            if owner:
+                pending = self._creating[role] = Future()
+        if not owner:
+            return pending.result()
+
+        name = None
+        try:
+            name = self._create(role)
+        finally:
+            with self._lock:
+                self._names[role] = name
+                del self._creating[role]
+            pending.set_result(name)
+        return name
+
+    def _create(self, role):
+        from google.genai import types
+        try:
+            cache = self._get_client(role).caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=self.prefix,
+                    ttl=f"{CACHE_TTL_SECONDS}s",
+                    display_name="prepai-interview",
+                ),
+            )
+            return cache.name
+        except Exception as e:
+            print(f"⚠️ Context cache unavailable for '{role}', sending the prefix inline: {e}")
+            return None
+
+    # --- ROLLING SUMMARY ---
+    def record_turn(self, topic, difficulty, is_correct):
+        self.history.append([topic, difficulty, bool(is_correct)])
+        del self.history[:-SUMMARY_TURNS]
+
+    def summary(self):
+        if not self.history:
+            return ""
+        turns = ", ".join(f"{topic} d{difficulty} {'correct' if ok else 'wrong'}" for topic, difficulty, ok in self.history)
+        return f"Recent answers: {turns}"
+
+    # --- REQUESTS ---
+    def build(self, role, turn_prompt, config=None, with_summary=False):
+        """-> (contents, config) for one call, with the prefix cached or inline."""
+        contents = turn_prompt
+        if with_summary and self.history:
+            contents = f"{self.summary()}\n{turn_prompt}"
+
+        name = self._cache_name(role)
+        update = {"cached_content": name} if name else {"system_instruction": self.prefix}
+        config = config.model_copy(update=update) if config else llm_replay.content_config(**update)
+        return contents, config
+
+    def close(self):
+        """Deletes this interview's context caches (they would expire after the TTL anyway)."""
+        with self._lock:
+            names = [(role, name) for role, name in self._names.items() if name]
+            self._names = {role: None for role in self._names}
+        for role, name in names:
+            try:
+                self._get_client(role).caches.delete(name=name)
+            except Exception as e:
+                print(f"⚠️ Could not delete context cache {name}: {e}")
@@ -0,0 +1,131 @@
+import re
+import math
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+# Local BM25 index over resume sections, so prompts carry the few parts of the resume that matter
+# for the job / current topic instead of its first 2000 characters (mostly name, contact details
+# and headers). Pure Python, built once per resume and cached by its hash: a resume is a few dozen
+# sections, so building and querying take well under a millisecond.
+
+# --- CONFIGURATION ---
+SECTION_CHARS = 500         # Long sections are split at line boundaries into chunks of about this size
+CACHE_SIZE = 64             # Resumes kept in memory (reconnects / repeated sessions reuse the index)
+K1 = 1.5
+B = 0.75
+
+HEADINGS = {
+    "summary", "profile", "objective", "experience", "work experience", "professional experience",
+    "employment", "projects", "skills", "technical skills", "education", "certifications",
+    "achievements", "publications", "awards", "internships", "leadership", "activities",
+}
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "of",
+    "on", "or", "our", "the", "to", "was", "we", "with", "you", "your", "will", "using", "used",
+}
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text):
+    # Keeps c++, c#, node.js, .net-style tokens; trailing dots are sentence ends
+    return [t.rstrip(".") for t in TOKEN.findall(text.lower()) if t.rstrip(".") not in STOPWORDS]
+
+
+def _is_heading(line):
+    words = line.rstrip(":").strip()
+    if not words or len(words) > 40 or len(words.split()) > 4:
+        return False
+    # Not isupper(): all-caps lines are as often content (company names, "AWS, GCP, SQL") as headings
+    return words.lower() in HEADINGS or line.endswith(":")
+
+
+def split_sections(text):
+    """Resume text -> list of sections ("Heading: body"), long ones chunked to ~SECTION_CHARS."""
+    sections = []
+    heading, lines = "", []
+
+    def flush():
+        chunk = ""
+        for line in lines:
+            if chunk and len(chunk) + len(line) > SECTION_CHARS:
+                sections.append(f"{heading}: {chunk}" if heading else chunk)
+                chunk = ""
+            chunk = f"{chunk} {line}".strip()
+        if chunk:
+            sections.append(f"{heading}: {chunk}" if heading else chunk)
+
+    for raw in (text or "").splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            continue
+        if _is_heading(line):
+            flush()
+            heading, lines = line.rstrip(":").strip().title(), []
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+class ResumeIndex:
+    def __init__(self, sections):
+        self.sections = list(sections)
+        self.docs = [Counter(tokenize(s)) for s in self.sections]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        df = Counter(term for doc in self.docs for term in doc)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def __len__(self):
+        return len(self.sections)
+
+    def scores(self, query):
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        scores = []
+        for doc, length in zip(self.docs, self.lengths):
+            norm = K1 * (1 - B + B * length / self.avg_length) if self.avg_length else K1
+            scores.append(sum(self.idf[t] * doc[t] * (K1 + 1) / (doc[t] + norm) for t in terms if t in doc))
+        return scores
+
+    def top_k(self, query, k=3, max_chars=1200, fallback=True):
+        """Best-matching sections in resume order, within max_chars. Without a match: the first sections, or none."""
+        scores = self.scores(query)
+        ranked = sorted((i for i in range(len(self.sections)) if scores[i] > 0), key=lambda i: -scores[i])
+        if not ranked and fallback:
+            ranked = list(range(len(self.sections)))
+        picked, used = [], 0
+        for i in ranked:
+            if len(picked) >= k:
+                break
+            if used + len(self.sections[i]) > max_chars and picked:
+                continue
+            picked.append(i)
+            used += len(self.sections[i])
+        return [self.sections[i][:max_chars] for i in sorted(picked)]
+
+    def excerpt(self, query, k=3, max_chars=1200, fallback=True):
+        return "\n".join(self.top_k(query, k, max_chars, fallback))
+
+
+# --- CACHE (by resume hash) ---
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_index(text=None, sections=None):
+    """Index for a resume text (or for already split sections, e.g. from saved session state)."""
+    if sections is None:
+        key = hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+    else:
+        key = hashlib.sha1("\x00".join(sections).encode("utf-8")).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    index = ResumeIndex(split_sections(text) if sections is None else sections)
+    with _cache_lock:
+        _cache[key] = index
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
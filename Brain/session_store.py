@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import zlib
+import secrets
+import sqlite3
+import threading
+
+# Interview sessions outlive a single WebSocket so that a client can reconnect (to any worker)
+# with its session token and continue where it left off.
+
+# --- CONFIGURATION ---
+# memory | sqlite:///path/to/sessions.db | redis://host:6379/0 (any Redis-compatible server)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(2 * 60 * 60)))
+
+
+def new_session_token():
+    return secrets.token_urlsafe(16)
+
+
+def dumps_state(state):
+    """Compact JSON + zlib. A typical interview state is a few hundred bytes."""
+    return zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+
+
+def loads_state(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class MemorySessionStore:
+    """Single-process store. Fine for one uvicorn worker; use sqlite/redis for more."""
+    def __init__(self, ttl=SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            item = self._data.get(token)
+            if item is None:
+                return None
+            expires, blob = item
+            if expires < time.time():
+                del self._data[token]
+                return None
+        return loads_state(blob)
+
+    def put(self, token, state):
+        blob = dumps_state(state)
+        with self._lock:
+            self._data[token] = (time.time() + self.ttl, blob)
+            # Opportunistic cleanup keeps abandoned sessions from piling up
+            if len(self._data) % 100 == 0:
+                now = time.time()
+                for key in [k for k, (exp, _) in self._data.items() if exp < now]:
+                    del self._data[key]
+
+    def delete(self, token):
+        with self._lock:
+            self._data.pop(token, None)
+
+
+class SQLiteSessionStore:
+    """Shared by every worker on the same host (WAL mode allows concurrent readers)."""
+    def __init__(self, path, ttl=SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, state BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+
+    def get(self, token):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE token = ? AND expires >= ?", (token, time.time())
+            ).fetchone()
+        return loads_state(row[0]) if row else None
+
+    def put(self, token, state):
+        blob = dumps_state(state)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (token, state, expires) VALUES (?, ?, ?)",
+                (token, blob, time.time() + self.ttl),
+            )
+
+    def delete(self, token):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+
+class RedisSessionStore:
+    """Any server that speaks the Redis protocol (Redis, Valkey, KeyDB, a local stand-in)."""
+    def __init__(self, url, ttl=SESSION_TTL_SECONDS, prefix="prepai:session:"):
+        import redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, token):
+        blob = self._client.get(self.prefix + token)
+        return loads_state(blob) if blob else None
+
+    def put(self, token, state):
+        self._client.setex(self.prefix + token, self.ttl, dumps_state(state))
+
+    def delete(self, token):
+        self._client.delete(self.prefix + token)
+
+
+def create_session_store(spec=SESSION_STORE):
+    if spec.startswith("sqlite:"):
+        # sqlite:///relative.db or sqlite:////absolute/path.db (same convention as SQLAlchemy)
+        path = spec[len("sqlite:///"):] if spec.startswith("sqlite:///") else spec[len("sqlite:"):]
+        return SQLiteSessionStore(path or "sessions.db")
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(spec)
+    if spec != "memory":
+        print(f"⚠️ Unknown SESSION_STORE '{spec}', using memory.")
+    return MemorySessionStore()
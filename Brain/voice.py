@@ -1,10 +1,12 @@
-import pyaudio
 import numpy as np
-import joblib
-import librosa
 import speech_recognition as sr
 import time
 import os
+import sys
+
+# Shared/ holds the process-wide model registry
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Shared"))
+from model_registry import get_confidence_model, find_confidence_model_path, CONFIDENCE_MODEL_CANDIDATES
 
 # --- CONFIGURATION ---
 SAMPLE_RATE = 22050
@@ -19,28 +21,14 @@ class VoiceAnalyzer:
         print("🎧 Initializing Voice & Confidence Model...")
         self.recognizer = sr.Recognizer()
         
-        # --- 🔍 SMART PATH FINDER ---
-        # 1. Get current folder (e.g., .../brainwave/brain)
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # 2. Get parent folder (e.g., .../brainwave)
-        parent_dir = os.path.dirname(current_dir)
-        
-        # Define the two possible places the model could be
-        path_option_1 = os.path.join(current_dir, "Voice_Confidence", "confidence_rf_model.pkl")
-        path_option_2 = os.path.join(parent_dir, "Voice_Confidence", "confidence_rf_model.pkl")
-
-        # Check which one actually exists
-        if os.path.exists(path_option_1):
-            valid_path = path_option_1
-        elif os.path.exists(path_option_2):
-            valid_path = path_option_2
-        else:
-            valid_path = None
+        # --- 📦 SHARED MODEL REGISTRY ---
+        # The model is loaded once per process (memory-mapped) and reused by every session
+        valid_path = find_confidence_model_path()
 
         if valid_path:
             print(f"🔍 Found model at: {valid_path}")
             try:
-                self.model = joblib.load(valid_path)
+                self.model = get_confidence_model()
                 self.has_model = True
                 print("✅ Confidence Model Loaded Successfully.")
             except Exception as e:
@@ -48,14 +36,15 @@ class VoiceAnalyzer:
                 print(f"⚠️ Model found but failed to load: {e}")
         else:
             self.has_model = False
-            print("⚠️ Model NOT found in 'brain/' or 'brainwave/' folders.")
-            print(f"   Checked: {path_option_1}")
-            print(f"   Checked: {path_option_2}")
+            print("⚠️ Model NOT found in 'Brain/' or 'Voice_Confidence/' folders.")
+            for path in CONFIDENCE_MODEL_CANDIDATES:
+                print(f"   Checked: {path}")
             print("   Running in Text-Only mode.")
 
     # ... (Rest of the file remains exactly the same) ...
     def get_linguistic_penalty(self, audio_chunk):
         try:
+            import librosa
             flatness = librosa.feature.spectral_flatness(y=audio_chunk)
             avg_flatness = np.mean(flatness)
             if avg_flatness < 0.01:
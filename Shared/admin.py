@@ -0,0 +1,16 @@
+import os
+import hmac
+
+# Access check for the operator-only routes of both servers (admin traces, key pool, session timelines).
+# With ADMIN_TOKEN set the x-admin-token header must match; without it only requests from this
+# machine are answered.
+
+# --- CONFIGURATION ---
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def admin_allowed(request):
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN)
+    return request.client is not None and request.client.host in LOCAL_HOSTS
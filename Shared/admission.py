@@ -0,0 +1,211 @@
+import os
+import math
+import time
+import asyncio
+from contextlib import contextmanager, nullcontext
+
+import telemetry
+
+# Session admission against a per-server budget. Costs are in "busy worker-seconds per second":
+#   video: processed fps x seconds per frame (the frame loop is one thread, so its budget is < 1.0)
+#   audio: a small idle cost per session, plus 1.0 while a transcription / Gemini turn is in flight
+# New sessions are admitted while they fit, queued (with position + ETA updates) while the queue has
+# room, and rejected after that. Before it comes to that, video sampling is thinned out as pressure
+# rises (sample_stride), which lowers the measured cost of every session and makes room. The stride
+# follows unshed demand (every session at stride 1), not the shed cost it produces itself, and only
+# comes back down with hysteresis after a minimum hold, so it does not flap around SHED_START.
+# All methods run on the event loop thread.
+
+# --- CONFIGURATION ---
+QUEUE_LIMIT = int(os.getenv("ADMISSION_QUEUE_LIMIT", "20"))
+QUEUE_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "120"))
+QUEUE_UPDATE_S = 5              # Queue position / ETA refresh for waiting clients
+SHED_START = 0.8                # Pressure at which video sampling starts thinning out
+MAX_STRIDE = 5                  # Never below 1 in 5 frames (10 fps -> 2 fps)
+SHED_HYSTERESIS = 0.1           # Demand must fall this far below a step before the stride is lowered
+STRIDE_HOLD_S = 5.0             # ... and the current stride must have held this long
+DEFAULT_HOLD_S = 600            # Assumed session length until real ones have been measured
+
+DECISIONS = telemetry.counter("prepai_admission_total", "Session admission decisions", ["server", "decision"])
+PRESSURE = telemetry.gauge("prepai_capacity_pressure", "Committed session cost / budget", ["server"])
+QUEUE_DEPTH = telemetry.gauge("prepai_admission_queue", "Sessions waiting for capacity", ["server"])
+
+
+class Ticket:
+    """One admitted session. cost = base estimate + work currently in flight; demand = the same without load shedding."""
+    def __init__(self, scheduler, cost, demand=None):
+        self.scheduler = scheduler
+        self.base_cost = cost
+        self.base_demand = cost if demand is None else demand
+        self.extra = 0.0
+        self.admitted_at = time.monotonic()
+
+    @property
+    def cost(self):
+        return self.base_cost + self.extra
+
+    @property
+    def demand(self):
+        return self.base_demand + self.extra
+
+    def update(self, cost, demand=None):
+        self.base_cost = cost
+        self.base_demand = cost if demand is None else demand
+        self.scheduler._changed()
+
+    @contextmanager
+    def work(self, units=1.0):
+        self.extra += units
+        self.scheduler._changed()
+        try:
+            yield
+        finally:
+            self.extra -= units
+            self.scheduler._changed()
+
+    def release(self):
+        self.scheduler.release(self)
+
+
+class _NullTicket:
+    """Stand-in where no scheduler is involved (scripts, benchmarks)."""
+    cost = 0.0
+    demand = 0.0
+
+    def update(self, cost, demand=None):
+        pass
+
+    def work(self, units=1.0):
+        return nullcontext()
+
+    def release(self):
+        pass
+
+
+NULL_TICKET = _NullTicket()
+
+
+class CapacityScheduler:
+    def __init__(self, server, budget, queue_limit=QUEUE_LIMIT, max_wait_s=QUEUE_MAX_WAIT_S):
+        self.server = server
+        self.budget = budget
+        self.queue_limit = queue_limit
+        self.max_wait_s = max_wait_s
+        self.tickets = set()
+        self.waiting = []               # One asyncio.Event per queued session, FIFO
+        self.hold_ewma = DEFAULT_HOLD_S
+        self.stride = 1
+        self.stride_since = time.monotonic()
+
+    # --- LOAD ---
+    def committed(self):
+        return sum(ticket.cost for ticket in self.tickets)
+
+    def pressure(self):
+        return self.committed() / self.budget if self.budget > 0 else 0.0
+
+    def demand_pressure(self):
+        demand = sum(ticket.demand for ticket in self.tickets)
+        return demand / self.budget if self.budget > 0 else 0.0
+
+    def fits(self, cost):
+        return self.committed() + cost <= self.budget
+
+    @staticmethod
+    def _stride_for(pressure):
+        if pressure <= SHED_START:
+            return 1
+        return min(MAX_STRIDE, math.ceil(pressure / SHED_START))
+
+    def sample_stride(self):
+        """Process 1 in N frames; N grows with unshed demand above SHED_START. Raised at once,
+        lowered only after STRIDE_HOLD_S and once demand is SHED_HYSTERESIS below the step."""
+        pressure = self.demand_pressure()
+        target = self._stride_for(pressure)
+        now = time.monotonic()
+        if target > self.stride:
+            self.stride, self.stride_since = target, now
+        elif target < self.stride and now - self.stride_since >= STRIDE_HOLD_S:
+            lower = self._stride_for(pressure + SHED_HYSTERESIS)
+            if lower < self.stride:
+                self.stride, self.stride_since = lower, now
+        return self.stride
+
+    def eta_s(self, position):
+        # Sessions ahead of us / sessions finishing per second
+        return round(position * self.hold_ewma / max(1, len(self.tickets)))
+
+    def _changed(self):
+        PRESSURE.labels(self.server).set(round(self.pressure(), 3))
+        for wake in self.waiting:
+            wake.set()
+
+    # --- ADMISSION ---
+    def grant(self, cost, demand=None):
+        ticket = Ticket(self, cost, demand)
+        self.tickets.add(ticket)
+        self._changed()
+        return ticket
+
+    async def admit(self, cost, notify=None, demand=None):
+        """
+        -> Ticket, or None if rejected / timed out. notify(payload) receives
+        {"type": "queue", "position", "eta_s"} while the session waits.
+        cost is what the session uses at the current stride, demand what it would use unshed.
+        """
+        if not self.waiting and self.fits(cost):
+            DECISIONS.labels(self.server, "admitted").inc()
+            return self.grant(cost, demand)
+        if len(self.waiting) >= self.queue_limit:
+            DECISIONS.labels(self.server, "rejected").inc()
+            return None
+
+        wake = asyncio.Event()
+        self.waiting.append(wake)
+        QUEUE_DEPTH.labels(self.server).set(len(self.waiting))
+        deadline = time.monotonic() + self.max_wait_s
+        last_update = None
+        try:
+            while True:
+                position = self.waiting.index(wake) + 1
+                if position == 1 and self.fits(cost):
+                    DECISIONS.labels(self.server, "queued").inc()
+                    return self.grant(cost, demand)
+
+                now = time.monotonic()
+                if now >= deadline:
+                    DECISIONS.labels(self.server, "timeout").inc()
+                    return None
+                if notify and (last_update is None or last_update[0] != position or now - last_update[1] >= QUEUE_UPDATE_S):
+                    await notify({"type": "queue", "position": position, "eta_s": self.eta_s(position)})
+                    last_update = (position, now)
+
+                wake.clear()
+                try:
+                    await asyncio.wait_for(wake.wait(), min(QUEUE_UPDATE_S, deadline - now))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting.remove(wake)
+            QUEUE_DEPTH.labels(self.server).set(len(self.waiting))
+            self._changed()
+
+    def release(self, ticket):
+        if ticket in self.tickets:
+            self.tickets.discard(ticket)
+            held = time.monotonic() - ticket.admitted_at
+            self.hold_ewma = 0.9 * self.hold_ewma + 0.1 * held
+            self._changed()
+
+    def stats(self):
+        return {
+            "server": self.server,
+            "budget": self.budget,
+            "committed": round(self.committed(), 3),
+            "pressure": round(self.pressure(), 3),
+            "demand_pressure": round(self.demand_pressure(), 3),
+            "sessions": len(self.tickets),
+            "queued": len(self.waiting),
+            "sample_stride": self.sample_stride(),
+            "avg_session_s": round(self.hold_ewma, 1),
+        }
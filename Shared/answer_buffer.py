@@ -0,0 +1,131 @@
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+# Audio for one answer, bounded. Chunks go into one growing bytearray; past SPILL_BYTES the answer
+# continues in a temp file, so per-session memory never exceeds SPILL_BYTES however long a client
+# talks. MAX_ANSWER_SECONDS / MAX_ANSWER_BYTES cap the answer itself: once either is reached the
+# buffer reports `full`, further chunks are dropped and the caller should end the answer.
+# take() hands the audio over without copying (the bytearray / file changes owner) and resets the buffer.
+
+# --- CONFIGURATION ---
+MAX_ANSWER_SECONDS = float(os.getenv("MAX_ANSWER_SECONDS", "300"))
+MAX_ANSWER_BYTES = int(os.getenv("MAX_ANSWER_BYTES", str(32 * 1024 * 1024)))
+SPILL_BYTES = int(os.getenv("ANSWER_SPILL_BYTES", str(2 * 1024 * 1024)))
+
+
+class AnswerAudio:
+    """A finished answer: in memory (`data`) or in a spill file (`path`). close() removes the file."""
+    def __init__(self, data=None, path=None, nbytes=None, truncated=False):
+        self.data = data
+        self.path = path
+        self.nbytes = nbytes if nbytes is not None else (len(data) if data is not None else 0)
+        self.truncated = truncated
+
+    def __len__(self):
+        return self.nbytes
+
+    def as_array(self, dtype):
+        """Samples without a copy: a view of the bytearray, or a memmap of the spill file."""
+        itemsize = np.dtype(dtype).itemsize
+        count = self.nbytes // itemsize
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        if self.path:
+            return np.memmap(self.path, dtype=dtype, mode="r", shape=(count,))
+        return np.frombuffer(self.data, dtype=dtype, count=count)
+
+    @contextmanager
+    def as_file(self, suffix=""):
+        """Path to the audio on disk (for ffmpeg); in-memory answers are written to a temp file."""
+        if self.path:
+            yield self.path
+            return
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
+            f.write(self.data)
+            path = f.name
+        try:
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        self.data = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+class AnswerBuffer:
+    def __init__(self, bytes_per_second=None, max_seconds=MAX_ANSWER_SECONDS,
+                 max_bytes=MAX_ANSWER_BYTES, spill_bytes=SPILL_BYTES, suffix=""):
+        # bytes_per_second is known for raw PCM; compressed audio is timed by arrival instead
+        self.bytes_per_second = bytes_per_second
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.suffix = suffix
+        self._reset()
+
+    def _reset(self):
+        self.memory = bytearray()
+        self.file = None
+        self.nbytes = 0
+        self.started_at = None
+        self.truncated = False
+
+    def __len__(self):
+        return self.nbytes
+
+    @property
+    def duration(self):
+        if self.bytes_per_second:
+            return self.nbytes / self.bytes_per_second
+        return time.monotonic() - self.started_at if self.started_at else 0.0
+
+    @property
+    def full(self):
+        return self.nbytes >= self.max_bytes or self.duration >= self.max_seconds
+
+    def append(self, chunk):
+        """Adds a chunk; returns False (and drops it) once the answer is full."""
+        if self.full:
+            self.truncated = True
+            return False
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        if self.file is None and self.nbytes + len(chunk) > self.spill_bytes:
+            self._spill()
+        if self.file is not None:
+            self.file.write(chunk)
+        else:
+            self.memory.extend(chunk)
+        self.nbytes += len(chunk)
+        return True
+
+    def _spill(self):
+        self.file = tempfile.NamedTemporaryFile(delete=False, suffix=self.suffix or ".audio")
+        self.file.write(self.memory)
+        self.memory = bytearray()
+
+    def take(self):
+        """-> AnswerAudio with everything buffered so far; the buffer starts over empty."""
+        if self.file is not None:
+            self.file.close()
+            answer = AnswerAudio(path=self.file.name, nbytes=self.nbytes, truncated=self.truncated)
+        else:
+            answer = AnswerAudio(data=self.memory, nbytes=self.nbytes, truncated=self.truncated)
+        self._reset()
+        return answer
+
+    def clear(self):
+        self.take().close()
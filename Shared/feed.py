@@ -0,0 +1,126 @@
+import os
+import math
+import time
+import asyncio
+
+# Live feed messages (video "realtime", audio "realtime_feed") arrive with every frame / chunk, but the
+# UI only repaints its bars a few times a second. A FeedPublisher per session and message type keeps
+# the newest update and sends it at most feedRate times a second; unchanged updates are not sent
+# (both only for clients that opted in: without a rate or delta every update goes out).
+# Opt-in per session (query string on /ws, init message on /ws/audio and /ws/session):
+#   feedRate=<hz>          send rate (0 = no rate limit)
+#   feedDelta=1            only the fields that changed, plus a full keyframe every KEYFRAME_S
+#   feedEncoding=msgpack   binary MessagePack frames instead of JSON text (needs the msgpack package)
+# Without options clients get every message, as before: the current frontend averages the values it
+# receives for its report, so coalescing is opt-in (or server-wide with FEED_RATE_HZ).
+
+# --- CONFIGURATION ---
+FEED_RATE_HZ = float(os.getenv("FEED_RATE_HZ", "0"))     # Default send rate, 0 = every update
+KEYFRAME_S = 1.0        # Full message at least this often, so a live client can always resync
+
+
+def feed_options(source):
+    """Init message or query params -> FeedPublisher.configure() kwargs. Bad values are ignored."""
+    options = {}
+    if source.get("feedRate") is not None:
+        try:
+            rate_hz = float(source["feedRate"])
+        except (TypeError, ValueError):
+            rate_hz = None
+        if rate_hz is None or not math.isfinite(rate_hz) or rate_hz < 0:
+            print(f"⚠️ Invalid feedRate {source['feedRate']!r}, using {FEED_RATE_HZ} Hz.")
+            rate_hz = FEED_RATE_HZ
+        options["rate_hz"] = rate_hz
+    if source.get("feedDelta") is not None:
+        options["delta"] = str(source["feedDelta"]).lower() in ("1", "true")
+    if source.get("feedEncoding"):
+        options["encoding"] = source["feedEncoding"]
+    return options
+
+
+class FeedPublisher:
+    def __init__(self, send, send_bytes=None, rate_hz=FEED_RATE_HZ, delta=False, encoding="json"):
+        self.send = send                # async send(payload dict) -> JSON
+        self.send_bytes = send_bytes    # async send_bytes(bytes), for msgpack
+        self.pending = None
+        self.last_sent = {}             # What the client currently shows
+        self.last_sent_at = 0.0
+        self.last_keyframe_at = 0.0
+        self.published = 0
+        self.sent = 0
+        self._timer = None
+        self._packer = None
+        self.closed = False
+        self.configure(rate_hz, delta, encoding)
+
+    def configure(self, rate_hz=None, delta=None, encoding=None):
+        if rate_hz is not None:
+            self.interval = 1.0 / rate_hz if rate_hz > 0 else 0.0
+        if delta is not None:
+            self.delta = delta
+        if encoding == "msgpack":
+            try:
+                import msgpack
+                self._packer = msgpack.Packer()
+            except ImportError:
+                print("⚠️ feedEncoding=msgpack requested but msgpack is not installed, sending JSON.")
+                self._packer = None
+            if self.send_bytes is None:
+                self._packer = None
+        elif encoding is not None:
+            self._packer = None
+
+    async def publish(self, message):
+        """Queues the newest update; it goes out now or at the next send slot."""
+        self.published += 1
+        self.pending = message
+        wait = self.last_sent_at + self.interval - time.monotonic()
+        if wait <= 0:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await self.flush()
+        except Exception:
+            pass    # Client went away between slots; the session loop notices on its next receive
+
+    async def flush(self):
+        message, self.pending = self.pending, None
+        if message is None or self.closed:
+            return
+        now = time.monotonic()
+        keyframe = now - self.last_keyframe_at >= KEYFRAME_S
+        changed = {k: v for k, v in message.items() if self.last_sent.get(k) != v}
+        # Without a rate or delta the client counts every message, repeats included
+        if not changed and not keyframe and (self.interval or self.delta):
+            return
+
+        if self.delta and not keyframe:
+            payload = {"type": message.get("type"), **changed}
+        else:
+            payload = message
+            self.last_keyframe_at = now
+        self.last_sent = dict(message)
+        self.last_sent_at = now
+        self.sent += 1
+
+        if self._packer is not None:
+            await self.send_bytes(self._packer.pack(payload))
+        else:
+            await self.send(payload)
+
+    def close(self):
+        self.closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.pending = None
+
+    def stats(self):
+        return {"published": self.published, "sent": self.sent}
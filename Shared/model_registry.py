@@ -0,0 +1,164 @@
+import os
+import time
+import hashlib
+import threading
+
+# --- CONFIGURATION ---
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The confidence pickle is shipped twice (Brain/ and Voice_Confidence/). Both copies resolve to ONE instance.
+CONFIDENCE_MODEL_CANDIDATES = [
+    os.path.join(repo_root, "Voice_Confidence", "confidence_rf_model.pkl"),
+    os.path.join(repo_root, "Brain", "confidence_rf_model.pkl"),
+]
+VIDEO_MODEL_PATH = os.path.join(repo_root, "pro", "temp_100_video_model.json")
+
+# Memory sharing between workers:
+# - mmap_mode="r" lets joblib memory-map the numpy arrays inside a pickle. That only helps artifacts
+#   that keep those arrays after unpickling. sklearn trees do not: Tree.__setstate__ copies the
+#   node / value arrays into its own buffers, so for confidence_rf_model.pkl every worker still holds
+#   a private copy and the maps are dropped right after the load.
+# - What does share the Random Forest is loading it BEFORE the workers fork: preload_models() (called
+#   by ai_server.py at import with PRELOAD_MODELS=1) under gunicorn --preload. The tree buffers are
+#   never written afterwards, so they stay shared copy-on-write. Compare memory_usage()["pss_bytes"]
+#   of two workers (GET /models) with and without it.
+DEFAULT_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+
+def _rss_bytes():
+    """Current resident set size of this process (0 if the platform does not expose it)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def memory_usage():
+    """RSS and PSS (shared pages split between the processes using them) of this process, in bytes."""
+    usage = {"rss_bytes": _rss_bytes(), "pss_bytes": 0}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    usage["pss_bytes"] = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    return usage
+
+
+def _file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded model artifacts.
+    Artifacts are keyed by file CONTENT, so duplicate copies on disk load only once.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._stats = {}
+        self._digests = {}
+
+    def _key(self, path):
+        real = os.path.realpath(path)
+        stat = os.stat(real)
+        cached = self._digests.get(real)
+        if cached and cached[0] == (stat.st_size, stat.st_mtime):
+            return cached[1]
+        digest = _file_digest(real)
+        self._digests[real] = ((stat.st_size, stat.st_mtime), digest)
+        return digest
+
+    def get(self, name, path, loader):
+        """Returns the loaded artifact for `path`, calling `loader(path)` only the first time."""
+        key = self._key(path)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished loading while we waited for the lock
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            model = loader(path)
+            load_ms = (time.perf_counter() - started) * 1000
+
+            self._models[key] = model
+            self._stats[name] = {
+                "path": path,
+                "load_ms": round(load_ms, 1),
+                "file_bytes": os.path.getsize(path),
+                "resident_bytes": max(0, _rss_bytes() - rss_before),
+            }
+            print(f"📦 Loaded '{name}' in {load_ms:.0f} ms")
+            return model
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(info) for name, info in self._stats.items()}
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+
+
+registry = ModelRegistry()
+
+
+# --- LOADERS ---
+def load_joblib(path, mmap_mode=DEFAULT_MMAP_MODE):
+    import joblib
+    if mmap_mode:
+        try:
+            return joblib.load(path, mmap_mode=mmap_mode)
+        except Exception as e:
+            # Compressed pickles cannot be memory-mapped; fall back to a regular load
+            print(f"⚠️ mmap load failed for {path} ({e}). Loading into memory.")
+    return joblib.load(path)
+
+
+def load_xgb_regressor(path):
+    import xgboost as xgb
+    model = xgb.XGBRegressor()
+    model.load_model(path)
+    return model
+
+
+def find_confidence_model_path():
+    for path in CONFIDENCE_MODEL_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get_confidence_model():
+    """The shared Random Forest confidence model, or None if no copy exists."""
+    path = find_confidence_model_path()
+    if path is None:
+        return None
+    return registry.get("confidence_rf", path, load_joblib)
+
+
+def get_video_model():
+    """The shared XGBoost body-language model, or None if the file is missing."""
+    if not os.path.exists(VIDEO_MODEL_PATH):
+        return None
+    return registry.get("video_xgb", VIDEO_MODEL_PATH, load_xgb_regressor)
+
+
+def preload_models():
+    """Loads the models a worker needs up front; call before forking so the workers share them."""
+    get_confidence_model()
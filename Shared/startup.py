@@ -0,0 +1,74 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+# Wall-clock reference for "how long since this process started importing us"
+PROCESS_T0 = time.perf_counter()
+
+
+class StartupReport:
+    """
+    Tracks how long each startup stage took and whether the server is ready for traffic.
+    Warm-up runs in a background thread so the HTTP port (and /ready) comes up immediately.
+    """
+    def __init__(self, service):
+        self.service = service
+        self.stages = []
+        self.error = None
+        self.ready_after_s = None
+        self._ready = threading.Event()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({"stage": name, "ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    def mark_ready(self):
+        self.ready_after_s = round(time.perf_counter() - PROCESS_T0, 3)
+        self._ready.set()
+        self.print_report()
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def start_warmup(self, warmup_fn):
+        """Runs warmup_fn(report) in a daemon thread and flips readiness when it returns."""
+        def runner():
+            try:
+                warmup_fn(self)
+            except Exception as e:
+                # A failed warm-up should not keep the replica out of rotation forever;
+                # the lazy paths will simply pay the cost on the first request instead.
+                self.error = str(e)
+                print(f"⚠️ Warm-up failed: {e}")
+            self.mark_ready()
+
+        thread = threading.Thread(target=runner, name=f"{self.service}-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    async def wait_ready(self, timeout=None):
+        if self.is_ready:
+            return True
+        return await asyncio.to_thread(self._ready.wait, timeout)
+
+    def as_dict(self):
+        return {
+            "service": self.service,
+            "ready": self.is_ready,
+            "ready_after_s": self.ready_after_s,
+            "stages": list(self.stages),
+            "error": self.error,
+        }
+
+    def print_report(self):
+        print(f"\n🚀 {self.service} ready after {self.ready_after_s:.2f}s")
+        for item in self.stages:
+            print(f"   {item['stage']:<28} {item['ms']:>8.1f} ms")
+        if self.error:
+            print(f"   ⚠️ warm-up error: {self.error}")
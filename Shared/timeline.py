@@ -0,0 +1,176 @@
+import os
+import re
+import time
+import threading
+
+import numpy as np
+
+# Per-session metric timelines. Every live sample (video bars, audio confidence, answer results)
+# is appended as a fixed-width NumPy record to <TIMELINE_DIR>/<session>.<stream>.bin. No header:
+# the record layout comes from SCHEMAS, so a file is just rows and can be memory-mapped as is.
+# Reports memory-map the file, cut the requested time range with a binary search on `t` and
+# average it down to a fixed number of points, so a long interview costs neither RAM nor DB space.
+# Session ids are interview tokens (unguessable), files older than TIMELINE_MAX_AGE_DAYS are swept
+# and reading a timeline back is an admin route on both servers.
+
+# --- CONFIGURATION ---
+TIMELINES = os.getenv("TIMELINES", "1") == "1"
+TIMELINE_DIR = os.getenv(
+    "TIMELINE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "timelines")
+)
+FLUSH_ROWS = 64             # Rows buffered per stream before they are written
+FLUSH_SECONDS = 2.0         # ... or after this long, so reports of live sessions stay current
+MAX_POINTS = 2000
+TIMELINE_MAX_AGE_DAYS = float(os.getenv("TIMELINE_MAX_AGE_DAYS", "30"))     # 0 = keep forever
+SWEEP_INTERVAL_S = 3600
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{16,64}")    # session_store tokens, uuid hex
+
+SCHEMAS = {
+    "video": np.dtype([("t", "<f8"), ("attention", "u1"), ("stability", "u1"), ("smoothness", "u1"), ("confidence", "u1")]),
+    "audio": np.dtype([("t", "<f8"), ("confidence", "<f4")]),
+    # grade_ms: grading (and, in combined mode, the next question), without transcription
+    "answers": np.dtype([("t", "<f8"), ("answer_s", "<f4"), ("grade_ms", "<f4"), ("score", "u1")]),
+}
+
+
+def valid_session_id(session_id):
+    return isinstance(session_id, str) and SESSION_ID.fullmatch(session_id) is not None
+
+
+def timeline_path(session_id, stream):
+    if not valid_session_id(session_id) or stream not in SCHEMAS:
+        raise ValueError("Unknown session or stream")
+    return os.path.join(TIMELINE_DIR, f"{session_id}.{stream}.bin")
+
+
+# --- WRITING ---
+class TimelineWriter:
+    """Buffered appends of one session's stream; t (unix seconds) is filled in automatically."""
+    def __init__(self, session_id, stream):
+        self.path = timeline_path(session_id, stream)
+        self.rows = np.zeros(FLUSH_ROWS, dtype=SCHEMAS[stream])
+        self.count = 0
+        self.flushed_at = time.monotonic()
+
+    def append(self, values):
+        row = self.rows[self.count]
+        row["t"] = time.time()
+        for name, value in values.items():
+            row[name] = value
+        self.count += 1
+        if self.count == FLUSH_ROWS or time.monotonic() - self.flushed_at >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        if not self.count:
+            return
+        try:
+            os.makedirs(TIMELINE_DIR, exist_ok=True)
+            with open(self.path, "ab") as f:
+                self.rows[:self.count].tofile(f)
+        except OSError as e:
+            print(f"⚠️ Timeline write failed ({self.path}): {e}")
+        self.count = 0
+
+
+class SessionTimeline:
+    """All streams of one session. Without a session id (or with TIMELINES=0) appends are no-ops."""
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.writers = {}
+
+    def append(self, stream, **values):
+        if not TIMELINES or not self.session_id:
+            return
+        writer = self.writers.get(stream)
+        if writer is None:
+            writer = self.writers[stream] = TimelineWriter(self.session_id, stream)
+        writer.append(values)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+
+# --- READING ---
+def read_range(session_id, stream, start=None, end=None, points=500):
+    """
+    Rows of one stream between start and end (unix seconds), averaged down to at most `points`
+    buckets. -> {"count", "points", "columns": {name: [...]}}, or None if nothing was recorded.
+    """
+    path = timeline_path(session_id, stream)
+    dtype = SCHEMAS[stream]
+    rows = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    if rows == 0:
+        return None
+    # A row being appended right now is not included: only whole rows are mapped
+    data = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+    t = data["t"]
+    lo = int(np.searchsorted(t, start, side="left")) if start is not None else 0
+    hi = int(np.searchsorted(t, end, side="right")) if end is not None else rows
+    window = data[lo:hi]
+    count = len(window)
+    points = max(1, min(int(points), MAX_POINTS))
+
+    columns = {}
+    if count > points:
+        edges = np.linspace(0, count, points + 1).astype(np.int64)
+        sizes = np.diff(edges)
+        for name in dtype.names:
+            sums = np.add.reduceat(window[name].astype(np.float64), edges[:-1])
+            columns[name] = np.round(sums / sizes, 3).tolist()
+    else:
+        for name in dtype.names:
+            columns[name] = np.round(window[name].astype(np.float64), 3).tolist()
+    return {"session": session_id, "stream": stream, "count": count,
+            "points": len(columns["t"]), "columns": columns}
+
+
+def list_streams(session_id):
+    return [stream for stream in SCHEMAS if os.path.exists(timeline_path(session_id, stream))]
+
+
+def timeline_report(session_id, stream=None, start=None, end=None, points=500):
+    """Body of the /timeline/{session} endpoints: one stream, or every stream the session has."""
+    streams = [stream] if stream else list_streams(session_id)
+    results = {}
+    for name in streams:
+        result = read_range(session_id, name, start, end, points)
+        if result is not None:
+            results[name] = result
+    return results
+
+
+# --- RETENTION ---
+def sweep(max_age_days=TIMELINE_MAX_AGE_DAYS):
+    """Deletes timeline files not written to for max_age_days. -> number of files removed."""
+    if max_age_days <= 0 or not os.path.isdir(TIMELINE_DIR):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in os.scandir(TIMELINE_DIR):
+        if not entry.name.endswith(".bin"):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass    # Another worker swept it first
+    return removed
+
+
+def start_retention():
+    """Sweeps now and every SWEEP_INTERVAL_S in a daemon thread (called once at server startup)."""
+    if not TIMELINES or TIMELINE_MAX_AGE_DAYS <= 0:
+        return
+
+    def run():
+        while True:
+            removed = sweep()
+            if removed:
+                print(f"🧹 Removed {removed} timeline files older than {TIMELINE_MAX_AGE_DAYS:g} days")
+            time.sleep(SWEEP_INTERVAL_S)
+
+    threading.Thread(target=run, name="timeline-retention", daemon=True).start()
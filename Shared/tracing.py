@@ -0,0 +1,128 @@
+import os
+import time
+import uuid
+import random
+import threading
+import functools
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+
+# --- CONFIGURATION ---
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))  # Share of sessions that get traced
+TRACE_RING_SIZE = int(os.getenv("TRACE_RING_SIZE", "200"))          # Traced sessions kept in memory
+MAX_SPANS_PER_SESSION = 5000                                        # Oldest spans drop off first
+
+_EPOCH = time.perf_counter()
+
+
+def _now_us():
+    return (time.perf_counter() - _EPOCH) * 1_000_000
+
+
+class SessionTrace:
+    """Spans for one interview session. Appends are thread-safe (deque)."""
+    sampled = True
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.spans = deque(maxlen=MAX_SPANS_PER_SESSION)
+
+    @contextmanager
+    def span(self, name, **args):
+        started = _now_us()
+        try:
+            yield
+        finally:
+            self.spans.append((name, started, _now_us() - started, threading.get_ident(), args))
+
+    def event(self, name, **args):
+        """Instant marker (zero duration), e.g. 'endpoint detected'."""
+        self.spans.append((name, _now_us(), None, threading.get_ident(), args))
+
+
+class _NullTrace:
+    """Stand-in for unsampled sessions: every call is a no-op."""
+    sampled = False
+    session_id = None
+
+    def span(self, name, **args):
+        return nullcontext()
+
+    def event(self, name, **args):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def traced(name):
+    """Method decorator: records a span on self.trace around the call."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with self.trace.span(name):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """Bounded ring of recent session traces, exportable as Chrome trace-event JSON."""
+    def __init__(self, sample_rate=TRACE_SAMPLE_RATE, ring_size=TRACE_RING_SIZE):
+        self.sample_rate = sample_rate
+        self.ring_size = ring_size
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_session(self, session_id=None):
+        if random.random() >= self.sample_rate:
+            return NULL_TRACE
+        trace = SessionTrace(session_id or uuid.uuid4().hex[:12])
+        with self._lock:
+            self._sessions[trace.session_id] = trace
+            while len(self._sessions) > self.ring_size:
+                self._sessions.popitem(last=False)
+        return trace
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def summary(self):
+        with self._lock:
+            traces = list(self._sessions.values())
+        return [
+            {
+                "session": t.session_id,
+                "started_at": t.started_at,
+                "spans": len(t.spans),
+            }
+            for t in traces
+        ]
+
+    def export_chrome(self, session_ids=None):
+        """{"traceEvents": [...]} for chrome://tracing / Perfetto. One process row per session."""
+        with self._lock:
+            if session_ids:
+                traces = [self._sessions[s] for s in session_ids if s in self._sessions]
+            else:
+                traces = list(self._sessions.values())
+
+        events = []
+        for pid, trace in enumerate(traces, 1):
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                           "args": {"name": f"session {trace.session_id}"}})
+            thread_ids = {}
+            for name, ts, dur, thread, args in list(trace.spans):
+                tid = thread_ids.setdefault(thread, len(thread_ids) + 1)
+                event = {"name": name, "cat": "interview", "pid": pid, "tid": tid, "ts": round(ts, 1), "args": args}
+                if dur is None:
+                    event.update(ph="i", s="t")
+                else:
+                    event.update(ph="X", dur=round(dur, 1))
+                events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+tracer = Tracer()
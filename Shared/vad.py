@@ -0,0 +1,171 @@
+from collections import deque
+
+import numpy as np
+
+# --- CONFIGURATION ---
+FRAME_MS = 20              # Analysis frame
+MIN_SPEECH_MS = 120        # Speech must last this long before we call it speech (ignores clicks)
+HANGOVER_MS = 200          # Short gaps inside words do not end a speech segment
+END_SILENCE_MS = 1000      # Silence after speech that counts as "answer finished"
+ENERGY_RATIO = 3.0         # Speech must be this many times louder than the tracked noise floor
+MIN_ENERGY = 0.003         # Absolute floor (float audio in -1..1) so digital silence never triggers
+MAX_ZCR = 0.35             # Hiss / fan noise crosses zero far more often than voiced speech
+MAX_FLATNESS = 0.5         # White-ish noise has a flat spectrum, speech does not
+NOISE_ADAPT = 0.05         # How quickly the noise floor follows the background level
+CALIBRATION_MS = 160       # The noise floor starts at the median energy of this much opening audio
+REESTIMATE_MS = 3000       # Unbroken "speech" this long is steady background: re-seed the floor from it
+
+
+def to_float32(samples):
+    """int16 PCM or float audio -> float32 in -1..1."""
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+def frame_features(frames):
+    """
+    Vectorised per-frame features for a (n_frames, frame_len) array.
+    Returns (rms energy, zero-crossing rate, spectral flatness), one value per frame.
+    """
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy, zcr, flatness
+
+
+class StreamingVAD:
+    """
+    Energy + zero-crossing + spectral-flatness voice activity detector with hangover smoothing.
+
+    Feed audio in any chunk size with process(); it returns a list of events:
+      {"event": "speech_start" | "speech_end" | "endpoint", "t": seconds since the stream started}
+    "endpoint" fires once, after end_silence_ms of silence that follows real speech.
+    """
+    def __init__(self, sample_rate, frame_ms=FRAME_MS, end_silence_ms=END_SILENCE_MS,
+                 min_speech_ms=MIN_SPEECH_MS, hangover_ms=HANGOVER_MS):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        self.frame_ms = frame_ms
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.hangover_frames = max(0, int(hangover_ms / frame_ms))
+        self.end_silence_frames = max(1, int(end_silence_ms / frame_ms))
+        self.calibration_frames = max(1, int(CALIBRATION_MS / frame_ms))
+        self.reestimate_frames = max(1, int(REESTIMATE_MS / frame_ms))
+        self.reset()
+
+    def reset(self):
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.frames_seen = 0
+        self.noise_floor = None
+        self._calibration = []
+        self._voiced_energy = deque(maxlen=self.reestimate_frames)
+        self.in_speech = False
+        self.endpointed = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self.speech_start_frame = None
+        self.last_speech_frame = None
+
+    # --- Public helpers ---
+    def seconds(self, frame_index):
+        return round(frame_index * self.frame_len / self.sample_rate, 3)
+
+    def speech_bounds(self):
+        """(first_sample, last_sample) of detected speech in stream coordinates, or None."""
+        if self.speech_start_frame is None:
+            return None
+        return (self.speech_start_frame * self.frame_len,
+                (self.last_speech_frame + 1) * self.frame_len)
+
+    def is_speech(self, energy, zcr, flatness):
+        if self.noise_floor is None:
+            # Seed the noise estimate from the background (answers start with silence far more often
+            # than not): the median of the first CALIBRATION_MS, however loud the room is
+            self._calibration.append(energy)
+            if len(self._calibration) >= self.calibration_frames:
+                self.noise_floor = float(np.median(self._calibration))
+                self._calibration = []
+            return False
+        threshold = max(MIN_ENERGY, self.noise_floor * ENERGY_RATIO)
+        voiced = energy > threshold and (zcr < MAX_ZCR or flatness < MAX_FLATNESS)
+        # Follow the background quickly in silence, and very slowly during "speech"
+        rate = NOISE_ADAPT if not voiced else NOISE_ADAPT * 0.02
+        self.noise_floor += rate * (energy - self.noise_floor)
+        if not voiced:
+            self._voiced_energy.clear()
+            return False
+        # Speech has gaps between words; REESTIMATE_MS without one is a background that got louder
+        # (fan, HVAC switching on), so it becomes the floor instead of waiting for the slow rate
+        self._voiced_energy.append(energy)
+        if len(self._voiced_energy) >= self.reestimate_frames:
+            self.noise_floor = float(np.median(self._voiced_energy))
+            self._voiced_energy.clear()
+        return True
+
+    # --- Streaming ---
+    def process(self, samples):
+        audio = to_float32(samples)
+        if len(self._pending):
+            audio = np.concatenate([self._pending, audio])
+
+        n_frames = len(audio) // self.frame_len
+        self._pending = audio[n_frames * self.frame_len:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = audio[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        energy, zcr, flatness = frame_features(frames)
+
+        events = []
+        for e, z, f in zip(energy, zcr, flatness):
+            self._step(self.is_speech(e, z, f), events)
+            self.frames_seen += 1
+        return events
+
+    def _step(self, voiced, events):
+        index = self.frames_seen
+        if voiced:
+            self._speech_run += 1
+            self._silence_run = 0
+            if not self.in_speech and self._speech_run >= self.min_speech_frames:
+                start = index - self._speech_run + 1
+                self.in_speech = True
+                self.endpointed = False
+                if self.speech_start_frame is None:
+                    self.speech_start_frame = start
+                events.append({"event": "speech_start", "t": self.seconds(start)})
+            if self.in_speech:
+                self.last_speech_frame = index
+            return
+
+        self._speech_run = 0
+        if self.last_speech_frame is None:
+            return
+        self._silence_run += 1
+        if self.in_speech and self._silence_run > self.hangover_frames:
+            self.in_speech = False
+            events.append({"event": "speech_end", "t": self.seconds(self.last_speech_frame + 1)})
+        if not self.endpointed and self._silence_run >= self.end_silence_frames:
+            self.endpointed = True
+            events.append({"event": "endpoint", "t": self.seconds(index + 1)})
+
+
+def trim_silence(samples, sample_rate, pad_ms=150):
+    """
+    Cuts leading and trailing silence before STT.
+    Returns the input unchanged if no speech is found, so a quiet answer is never thrown away.
+    """
+    vad = StreamingVAD(sample_rate)
+    vad.process(samples)
+    bounds = vad.speech_bounds()
+    if bounds is None:
+        return samples
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, bounds[0] - pad)
+    end = min(len(samples), bounds[1] + pad)
+    return samples[start:end]
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Make sure features.py next to this script is the one we import
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import extract_features, FEATURE_VERSION
+
+# --- CONFIGURATION ---
+SAMPLE_RATE = 22050
+WINDOW_SECONDS = 5.0     # Same window the live listener scores on
+HOP_SECONDS = 1.0
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".webm")
+FLATNESS_PENALTY_THRESHOLD = 0.01   # Mirrors VoiceAnalyzer.get_linguistic_penalty
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(script_dir, "confidence_rf_model.pkl")
+DEFAULT_STORE_DIR = os.path.join(script_dir, "feature_store")
+
+
+# --- HELPERS ---
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_audio_files(root):
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                found.append(os.path.abspath(os.path.join(dirpath, name)))
+    return sorted(found)
+
+
+# --- FEATURE STORE ---
+class FeatureStore:
+    """
+    Columnar on-disk cache of windowed features.
+    One .npz per (file hash, feature version, window params) holding one array per column,
+    plus a manifest that remembers path -> (size, mtime, hash) so unchanged files are not re-hashed.
+    """
+    def __init__(self, root, window_seconds, hop_seconds):
+        self.root = root
+        self.partition = os.path.join(
+            root, f"v{FEATURE_VERSION}_w{window_seconds:g}_h{hop_seconds:g}"
+        )
+        os.makedirs(self.partition, exist_ok=True)
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError):
+                self.manifest = {}
+
+    def hash_for(self, path):
+        stat = os.stat(path)
+        entry = self.manifest.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry["hash"]
+        file_hash = file_sha256(path)
+        self.manifest[path] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": file_hash}
+        return file_hash
+
+    def _entry_path(self, file_hash):
+        return os.path.join(self.partition, f"{file_hash}.npz")
+
+    def has(self, file_hash):
+        return os.path.exists(self._entry_path(file_hash))
+
+    def put(self, file_hash, columns):
+        # Write to a temp name first so a crash never leaves a half-written entry behind
+        final_path = self._entry_path(file_hash)
+        tmp_path = final_path + ".tmp.npz"
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, final_path)
+
+    def get(self, file_hash):
+        with np.load(self._entry_path(file_hash)) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+
+# --- WORKER (runs inside the process pool) ---
+def extract_file_windows(path, window_seconds, hop_seconds, sample_rate=SAMPLE_RATE):
+    import librosa
+
+    y, sr = librosa.load(path, sr=sample_rate)
+    window = int(window_seconds * sr)
+    hop = max(1, int(hop_seconds * sr))
+
+    # Short clips still get one (shorter) window instead of being dropped
+    if len(y) <= window:
+        starts = [0]
+    else:
+        starts = list(range(0, len(y) - window + 1, hop))
+
+    t_start, feature_rows, flatness = [], [], []
+    for start in starts:
+        chunk = y[start:start + window]
+        # NaN marks a failed window so score_batch can leave it out (0s would look like silence)
+        feature_rows.append(extract_features(audio_array=chunk, sample_rate=sr, error_value=np.nan))
+        try:
+            flatness.append(float(np.mean(librosa.feature.spectral_flatness(y=chunk))))
+        except Exception:
+            flatness.append(1.0)
+        t_start.append(start / sr)
+
+    return {
+        "t_start": np.asarray(t_start, dtype=np.float32),
+        "features": np.asarray(feature_rows, dtype=np.float32).reshape(len(starts), -1),
+        "flatness": np.asarray(flatness, dtype=np.float32),
+        "duration": np.asarray([len(y) / sr], dtype=np.float32),
+    }
+
+
+# --- BATCH SCORING ---
+def score_batch(model, entries):
+    """
+    Scores every window of every file with ONE predict_proba call.
+    entries: list of (path, columns) -> returns {path: timeline dict}
+    """
+    if not entries:
+        return {}
+
+    all_features = np.concatenate([cols["features"] for _, cols in entries])
+    clean = np.nan_to_num(all_features)
+    raw_scores = model.predict_proba(clean)[:, 1] * 100
+
+    timelines = {}
+    offset = 0
+    for path, cols in entries:
+        n = len(cols["t_start"])
+        scores = raw_scores[offset:offset + n]
+        offset += n
+
+        penalty = np.where(cols["flatness"] < FLATNESS_PENALTY_THRESHOLD, 0.5, 1.0)
+        final = scores * penalty
+        # Windows whose features came back broken should not count towards the average
+        valid = ~np.isnan(cols["features"]).any(axis=1)
+
+        timelines[path] = {
+            "duration": float(cols["duration"][0]),
+            "windows": [
+                {"t": round(float(t), 3), "confidence": round(float(c), 2)}
+                for t, c, ok in zip(cols["t_start"], final, valid) if ok
+            ],
+            "average_confidence": round(float(final[valid].mean()), 2) if valid.any() else None,
+        }
+    return timelines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vocal-confidence scoring over recorded answers")
+    parser.add_argument("audio_dir", help="Directory that is searched recursively for audio files")
+    parser.add_argument("--out", default="confidence_timelines.json", help="Where to write the JSON timelines")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="Feature store directory")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Path to confidence_rf_model.pkl")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Window length in seconds")
+    parser.add_argument("--hop", type=float, default=HOP_SECONDS, help="Hop between windows in seconds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size")
+    args = parser.parse_args()
+
+    started = time.time()
+    files = find_audio_files(args.audio_dir)
+    print(f"📂 Found {len(files)} audio files in {args.audio_dir}")
+
+    store = FeatureStore(args.store, args.window, args.hop)
+    hashes = {path: store.hash_for(path) for path in files}
+    store.save_manifest()
+
+    # Identical recordings under different names are only extracted once
+    todo = {}
+    for path, file_hash in hashes.items():
+        if not store.has(file_hash) and file_hash not in todo:
+            todo[file_hash] = path
+    print(f"♻️  {len(files) - len(todo)} cached, ⚙️  {len(todo)} to extract")
+
+    failed = set()
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(extract_file_windows, path, args.window, args.hop): file_hash
+                for file_hash, path in todo.items()
+            }
+            for i, future in enumerate(as_completed(futures), 1):
+                file_hash = futures[future]
+                try:
+                    store.put(file_hash, future.result())
+                    print(f"\r   Extracted {i}/{len(todo)}", end="")
+                except Exception as e:
+                    failed.add(file_hash)
+                    print(f"\n⚠️ Extraction failed for {todo[file_hash]}: {e}")
+        print()
+
+    import joblib
+    model = joblib.load(args.model)
+    entries = [(path, store.get(h)) for path, h in hashes.items() if h not in failed]
+    timelines = score_batch(model, entries)
+    for path, file_hash in hashes.items():
+        if path in timelines:
+            timelines[path]["hash"] = file_hash
+
+    with open(args.out, "w") as f:
+        json.dump({
+            "feature_version": FEATURE_VERSION,
+            "window_seconds": args.window,
+            "hop_seconds": args.hop,
+            "files": timelines,
+        }, f, indent=2)
+
+    print(f"✅ Scored {len(timelines)} files in {time.time() - started:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
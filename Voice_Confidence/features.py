@@ -1,13 +1,27 @@
+import time
 import numpy as np
 import librosa
 import parselmouth
 from parselmouth.praat import call
 
-def extract_features(audio_path=None, audio_array=None, sample_rate=22050):
+# Bump this whenever the feature vector below changes, so cached features are recomputed
+FEATURE_VERSION = 2     # 2: failed windows are stored as NaN instead of zeros
+
+def _lap(timings, stage, started):
+    """Adds the time since `started` to timings[stage] (no-op when timings is None)."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - started) * 1000
+    return now
+
+def extract_features(audio_path=None, audio_array=None, sample_rate=22050, timings=None, error_value=0):
     """
     Extracts 8 specific confidence markers.
     Accepts either a file path OR a raw numpy array (for live mode).
+    Pass a dict as `timings` to get per-stage milliseconds (used by the benchmarks).
+    On failure every feature is `error_value` (batch scoring passes NaN to tell failures from silence).
     """
+    t = time.perf_counter()
     try:
         # 1. LOAD AUDIO for Librosa (Energy, Pauses)
         if audio_path:
@@ -19,6 +33,7 @@ def extract_features(audio_path=None, audio_array=None, sample_rate=22050):
             sr = sample_rate
             # Create Parselmouth Sound object from array
             sound = parselmouth.Sound(y, sampling_frequency=sr)
+        t = _lap(timings, "load", t)
 
         # --- A. PITCH & JITTER (The "Shaky Voice" detectors) ---
         pitch = sound.to_pitch()
@@ -31,23 +46,28 @@ def extract_features(audio_path=None, audio_array=None, sample_rate=22050):
         else:
             pitch_mean = 0
             pitch_var = 0
+        t = _lap(timings, "pitch", t)
 
         # Jitter (Micro-fluctuations in pitch)
         pointProcess = call(sound, "To PointProcess (periodic, cc)", 75, 500)
         jitter = call(pointProcess, "Get jitter (local)", 0, 0, 0.0001, 0.02, 1.3)
+        t = _lap(timings, "jitter", t)
 
         # --- B. ENERGY & SHIMMER (The "Volume Stability" detectors) ---
         rms = librosa.feature.rms(y=y)[0]
         energy_mean = np.mean(rms)
         energy_var = np.var(rms)
+        t = _lap(timings, "energy", t)
 
         # Shimmer (Micro-fluctuations in loudness)
         shimmer = call([sound, pointProcess], "Get shimmer (local)", 0, 0, 0.0001, 0.02, 1.3, 1.6)
+        t = _lap(timings, "shimmer", t)
 
         # --- C. HNR (Harmonics-to-Noise Ratio) ---
         # Low HNR = Breathy/Hoarse voice (often correlates with nervousness)
         harmonicity = call(sound, "To Harmonicity (cc)", 0.01, 75, 0.1, 1.0)
         hnr = call(harmonicity, "Get mean", 0, 0)
+        t = _lap(timings, "hnr", t)
 
         # --- D. SPEAKING RATE & PAUSES ---
         # We detect non-silent segments
@@ -61,6 +81,7 @@ def extract_features(audio_path=None, audio_array=None, sample_rate=22050):
         # This is a heuristic: counting "peaks" in energy envelope
         peaks = librosa.util.peak_pick(rms, pre_max=5, post_max=5, pre_avg=5, post_avg=5, delta=0.1, wait=10)
         speaking_rate = len(peaks) / (len(y) / sr) if len(y) > 0 else 0
+        t = _lap(timings, "pauses_rate", t)
 
         # Return vector of 8 features
         # [PitchMean, PitchVar, EnergyMean, EnergyVar, Jitter, Shimmer, HNR, SpeakingRate]
@@ -68,4 +89,4 @@ def extract_features(audio_path=None, audio_array=None, sample_rate=22050):
 
     except Exception as e:
         print(f"Feature Extraction Error: {e}")
-        return [0]*8
\ No newline at end of file
+        return [error_value]*8
\ No newline at end of file
@@ -1,9 +1,14 @@
-import pyaudio
 import numpy as np
-import joblib
-import librosa
 import speech_recognition as sr
 import time
+import os
+import sys
+
+# Shared/ holds the process-wide model registry
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Shared"))
+from model_registry import get_confidence_model
+from vad import StreamingVAD
+from answer_buffer import AnswerBuffer
 
 # --- CONFIGURATION ---
 SAMPLE_RATE = 22050
@@ -11,24 +16,29 @@ CHUNK_DURATION = 0.5
 CONFIDENCE_WINDOW = 5   
 CHUNK_SIZE = int(SAMPLE_RATE * CHUNK_DURATION) 
 
-# 🔥 UPDATED: Wait for 3 seconds of silence
-SILENCE_THRESHOLD = 0.01
-SILENCE_DURATION_TO_STOP = 3.0 
+# 🔥 UPDATED: The VAD ends the answer after this much silence (was a fixed 3 s)
+SILENCE_DURATION_TO_STOP = 1.2
 
 class VoiceAnalyzer:
     def __init__(self):
         print("🎧 Initializing Voice & Confidence Model...")
         self.recognizer = sr.Recognizer()
         try:
-            self.model = joblib.load("Voice_Confidence\confidence_rf_model.pkl")
-            self.has_model = True
-            print("✅ Confidence Model Loaded.")
-        except:
+            # Loaded once per process through the shared registry, not once per session
+            self.model = get_confidence_model()
+            self.has_model = self.model is not None
+        except Exception:
+            self.model = None
             self.has_model = False
+
+        if self.has_model:
+            print("✅ Confidence Model Loaded.")
+        else:
             print("⚠️ Model not found. Running in Text-Only mode.")
 
     def get_linguistic_penalty(self, audio_chunk):
         try:
+            import librosa
             flatness = librosa.feature.spectral_flatness(y=audio_chunk)
             avg_flatness = np.mean(flatness)
             if avg_flatness < 0.01:
@@ -38,6 +48,8 @@ class VoiceAnalyzer:
         return 1.0
 
     def listen(self):
+        # Only the local microphone loop needs PortAudio; servers never import it
+        import pyaudio
         p = pyaudio.PyAudio()
         stream = p.open(format=pyaudio.paFloat32,
                         channels=1,
@@ -46,12 +58,13 @@ class VoiceAnalyzer:
                         frames_per_buffer=CHUNK_SIZE)
 
         rolling_buffer = np.zeros(SAMPLE_RATE * CONFIDENCE_WINDOW, dtype=np.float32)
-        full_audio_frames = []
+        # float32 samples; bounded, and spilled to a temp file if an answer runs long
+        answer_buffer = AnswerBuffer(bytes_per_second=SAMPLE_RATE * 4)
         confidence_scores = [] # To calculate average later
 
         print(f"\n🎤 LISTENING... (Speak now)")
         
-        silence_start = None
+        vad = StreamingVAD(SAMPLE_RATE, end_silence_ms=int(SILENCE_DURATION_TO_STOP * 1000))
         is_speaking = False
 
         try:
@@ -59,29 +72,27 @@ class VoiceAnalyzer:
                 # 1. Read Audio
                 data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
                 new_audio = np.frombuffer(data, dtype=np.float32)
-                full_audio_frames.append(data)
-                
-                # 2. Check Volume
-                volume = np.mean(np.abs(new_audio))
+                answer_buffer.append(data)
+                if answer_buffer.full:
+                    print("\n✂️ Maximum answer length reached. Processing...")
+                    break
                 
-                if volume < SILENCE_THRESHOLD:
+                # 2. Voice Activity Detection (energy + zero-crossing + flatness, with hangover)
+                events = vad.process(new_audio)
+                for event in events:
+                    if event["event"] == "speech_start":
+                        is_speaking = True
+
+                if vad.endpointed:
+                    print("\n🛑 End of answer detected. Processing...")
+                    break
+
+                if not vad.in_speech:
                     # --- SILENCE LOGIC ---
                     if is_speaking:
-                        # Only start counting silence if we have previously spoken
-                        if silence_start is None:
-                            silence_start = time.time()
-                        
-                        # Check if 3 seconds have passed
-                        elapsed = time.time() - silence_start
-                        remaining = SILENCE_DURATION_TO_STOP - elapsed
-                        
-                        if remaining <= 0:
-                            print("\n🛑 Silence limit reached. Processing...")
-                            break
-                        
                         # 🔥 CRITICAL: Do NOT update the bar during silence.
                         # Just print a static message so the bar doesn't "jitter"
-                        print(f"\r⏳ Waiting for silence... ({remaining:.1f}s)   ", end="")
+                        print(f"\r⏳ Pause detected, answer ends after {SILENCE_DURATION_TO_STOP:.1f}s of silence...", end="")
                     else:
                         print(f"\rWaiting for speech...", end="")
                     
@@ -89,9 +100,6 @@ class VoiceAnalyzer:
 
                 else:
                     # --- SPEAKING LOGIC ---
-                    is_speaking = True
-                    silence_start = None # Reset timer
-                    
                     # Update Rolling Buffer
                     rolling_buffer = np.roll(rolling_buffer, -len(new_audio))
                     rolling_buffer[-len(new_audio):] = new_audio
@@ -133,9 +141,17 @@ class VoiceAnalyzer:
 
         # --- CONVERT TO TEXT ---
         print("📝 Converting speech to text...")
-        raw_data = b''.join(full_audio_frames)
-        audio_np = np.frombuffer(raw_data, dtype=np.float32)
+        answer = answer_buffer.take()
+        audio_np = answer.as_array(np.float32)
+
+        # Only the detected speech (plus a little padding) goes to STT
+        bounds = vad.speech_bounds()
+        if bounds:
+            pad = int(SAMPLE_RATE * 0.15)
+            audio_np = audio_np[max(0, bounds[0] - pad):bounds[1] + pad]
         audio_int16 = (audio_np * 32767).astype(np.int16)
+        del audio_np
+        answer.close()
         audio_data = sr.AudioData(audio_int16.tobytes(), SAMPLE_RATE, 2)
 
         try:
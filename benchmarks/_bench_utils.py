@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import platform
+import numpy as np
+
+# Make the repo folders importable the same way the servers do it
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("Shared", "Voice_Confidence", "Brain", "pro"):
+    path = os.path.join(repo_root, folder)
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+def summarize(samples_ms):
+    """p50 / p99 / mean / max of a list of millisecond timings."""
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    if arr.size == 0:
+        return {"n": 0}
+    return {
+        "n": int(arr.size),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+def time_call(fn, repeats, warmup=1):
+    """Runs fn() `warmup` times untimed, then `repeats` times; returns the timings in ms."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def check_thresholds(results, thresholds):
+    """
+    results: {"stage_name": {"<metric>": value, ...}}  (e.g. "extract_features.total@5s")
+    thresholds: {"stage_name": {"max_<metric>": limit}}; an entry without the "@length" suffix applies to
+    every length, and a length-specific entry adds to it (overriding limits with the same key)
+    Returns a list of human-readable regressions.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = name.split("@")[0]
+        limits = {**thresholds.get(base, {}), **thresholds.get(name, {})}
+        for key, limit in limits.items():
+            metric = key[len("max_"):] if key.startswith("max_") else key
+            value = metrics.get(metric)
+            if value is not None and value > limit:
+                regressions.append(f"{name}: {metric}={value} > {limit}")
+    return regressions
+
+
+def compare_baseline(results, baseline_results, tolerance, metric="p50_ms"):
+    """Flags stages that got slower than `tolerance` (0.2 = +20%) versus a previous JSON run."""
+    regressions = []
+    for name, metrics in results.items():
+        old = baseline_results.get(name, {}).get(metric)
+        new = metrics.get(metric)
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def finish(report, out_path, thresholds_path=None, baseline_path=None, tolerance=0.2):
+    """Writes the JSON report, prints regressions and returns the process exit code."""
+    regressions = []
+    if thresholds_path and os.path.exists(thresholds_path):
+        with open(thresholds_path) as f:
+            regressions += check_thresholds(report["results"], json.load(f))
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions += compare_baseline(report["results"], json.load(f)["results"], tolerance)
+
+    report["regressions"] = regressions
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📄 Results written to {out_path}")
+    if regressions:
+        print("❌ REGRESSIONS:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print("✅ No regressions.")
+    return 0
@@ -0,0 +1,166 @@
+import os
+import io
+import time
+import argparse
+import numpy as np
+
+from _bench_utils import summarize, time_call, environment, finish
+
+# --- CONFIGURATION ---
+SAMPLE_RATE = 22050
+DEFAULT_LENGTHS = [0.5, 1, 3, 5, 10, 30, 60]
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_thresholds.json")
+
+
+# --- FIXTURES ---
+def synthetic_voice(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """
+    Speech-like test signal: harmonic voice with vibrato, ~4 syllables/s,
+    a short pause every 2 s and a little background noise. Deterministic per seed.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 12 * np.sin(2 * np.pi * 5 * t) + 20 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2
+    pauses = ((t % 2.0) < 1.7).astype(np.float64)
+    signal = 0.2 * voice * syllables * pauses + 0.005 * rng.standard_normal(len(t))
+    return signal.astype(np.float32)
+
+
+def load_fixture(path, seconds, sample_rate=SAMPLE_RATE):
+    """Loads a recorded answer and crops / tiles it to exactly `seconds`."""
+    import librosa
+    y, _ = librosa.load(path, sr=sample_rate)
+    needed = int(seconds * sample_rate)
+    if len(y) < needed:
+        y = np.tile(y, needed // max(1, len(y)) + 1)
+    return y[:needed].astype(np.float32)
+
+
+def to_webm_bytes(samples, sample_rate=SAMPLE_RATE):
+    """Encodes float samples the way MediaRecorder would send them (WebM/Opus)."""
+    from pydub import AudioSegment
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+    segment = AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+    out = io.BytesIO()
+    segment.export(out, format="webm", codec="libopus")
+    return out.getvalue()
+
+
+def stutter_text(seconds, seed=0):
+    """~2.5 words per second of answer, with about one word in ten repeated."""
+    rng = np.random.default_rng(seed)
+    vocabulary = ["I", "used", "python", "to", "build", "the", "the", "pipeline", "and", "um", "tested", "it"]
+    words = []
+    for _ in range(max(1, int(seconds * 2.5))):
+        word = vocabulary[rng.integers(len(vocabulary))]
+        words.append(word)
+        if rng.random() < 0.1:
+            words.append(word)
+    return " ".join(words)
+
+
+# --- STAGES ---
+def bench_length(seconds, signal, repeats, analyzer, model):
+    from features import extract_features
+    import ai_server
+
+    results = {}
+    tag = f"@{seconds:g}s"
+
+    # 1. extract_features, end to end and per internal stage
+    stage_timings = {}
+    total = []
+    for i in range(repeats + 1):
+        timings = {}
+        started = time.perf_counter()
+        extract_features(audio_array=signal, sample_rate=SAMPLE_RATE, timings=timings)
+        elapsed = (time.perf_counter() - started) * 1000
+        if i == 0:
+            continue  # warm-up run (parselmouth / numba first-call costs)
+        total.append(elapsed)
+        for stage, ms in timings.items():
+            stage_timings.setdefault(stage, []).append(ms)
+
+    results["extract_features.total" + tag] = summarize(total)
+    for stage, samples in stage_timings.items():
+        results[f"extract_features.{stage}" + tag] = summarize(samples)
+
+    # 2. Linguistic penalty (spectral flatness)
+    results["get_linguistic_penalty" + tag] = summarize(
+        time_call(lambda: analyzer.get_linguistic_penalty(signal), repeats))
+
+    # 3. Random Forest scoring of one feature vector (cost does not depend on length)
+    if model is not None:
+        feats = [extract_features(audio_array=signal, sample_rate=SAMPLE_RATE)]
+        results["predict_proba" + tag] = summarize(time_call(lambda: model.predict_proba(feats), repeats))
+
+    # 4. WebM decode + VAD trim + (stubbed) STT
+    webm = to_webm_bytes(signal)
+    results["decode_audio_bytes" + tag] = summarize(
+        time_call(lambda: ai_server.decode_audio_bytes(webm), repeats))
+    results["transcribe_audio_bytes" + tag] = summarize(
+        time_call(lambda: ai_server.transcribe_audio_bytes(webm), repeats))
+
+    # 5. Transcript clean-up
+    text = stutter_text(seconds)
+    results["clean_stutter" + tag] = summarize(time_call(lambda: ai_server.clean_stutter(text), repeats))
+
+    # Realtime budget: how many ms of CPU each second of audio costs
+    for name, stats in results.items():
+        if stats.get("n"):
+            stats["ms_per_audio_s"] = round(stats["p50_ms"] / seconds, 3)
+            stats["audio_seconds"] = seconds
+    return results
+
+
+def stub_stt():
+    """Replace the network STT call so only local decode/trim work is measured."""
+    import speech_recognition as sr
+    sr.Recognizer.recognize_google = lambda self, audio_data, *args, **kwargs: "stubbed transcript"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio feature-extraction and scoring hot paths")
+    parser.add_argument("--lengths", default=",".join(str(x) for x in DEFAULT_LENGTHS),
+                        help="Comma-separated clip lengths in seconds")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--fixture", help="Recorded answer (any audio file) to use instead of the synthetic voice")
+    parser.add_argument("--out", default="bench_audio.json")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--baseline", help="Previous bench_audio.json to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    stub_stt()
+    from voice import VoiceAnalyzer
+    from model_registry import get_confidence_model
+
+    analyzer = VoiceAnalyzer()
+    model = get_confidence_model()
+    lengths = [float(x) for x in args.lengths.split(",")]
+
+    results = {}
+    for seconds in lengths:
+        signal = load_fixture(args.fixture, seconds) if args.fixture else synthetic_voice(seconds)
+        print(f"⏱️  Benchmarking {seconds:g}s clip...")
+        results.update(bench_length(seconds, signal, args.repeats, analyzer, model))
+
+    report = {
+        "suite": "audio",
+        "environment": environment(),
+        "config": {"lengths": lengths, "repeats": args.repeats, "fixture": args.fixture, "sample_rate": SAMPLE_RATE},
+        "results": results,
+    }
+    for name in sorted(results):
+        stats = results[name]
+        print(f"   {name:<42} p50 {stats['p50_ms']:>9.2f} ms   p99 {stats['p99_ms']:>9.2f} ms")
+
+    raise SystemExit(finish(report, args.out, args.thresholds, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
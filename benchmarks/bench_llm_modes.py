@@ -0,0 +1,102 @@
+import json
+import time
+import argparse
+
+from _bench_utils import summarize, environment
+
+# Answer -> next question, two ways:
+#   two_call: evaluate_answer() (grader) then generate_question() (asker)
+#   combined: grade_and_ask(), one structured call returning grade + next question
+# Runs against real Gemini, or against benchmarks/fake_services.py with GEMINI_BASE_URL set
+# (then the numbers reflect round trips and prompt sizes, not model speed), or with LLM_MODE=replay.
+# The webhook is stubbed out: nothing is posted to WEBHOOK_URL and its time is not in the numbers.
+
+# --- CONFIGURATION ---
+TOPICS = ["Python", "SQL", "System Design"]
+ANSWERS = [
+    "A list keeps insertion order and allows duplicates; a set is unordered and gives O(1) membership checks.",
+    "I would add an index on the filtered column and check the query plan before and after.",
+    "I am not sure, maybe it just retries forever until it works.",
+]
+
+
+def run_mode(bot, snapshot, mode, turns):
+    from Brain import AdaptiveInterviewer
+
+    latencies = []
+    tokens = []
+    calls = []
+    for i in range(turns):
+        if bot.current_topic_index >= len(bot.topics):
+            # Interview over: start again from the same snapshot so every mode runs `turns` answers
+            bot = AdaptiveInterviewer.from_state(snapshot)
+        answer = ANSWERS[i % len(ANSWERS)]
+        before = dict(bot.llm_usage)
+
+        started = time.perf_counter()
+        if mode == "combined":
+            bot.grade_and_ask(answer)
+        else:
+            bot.evaluate_answer(answer)
+            if bot.current_topic_index < len(bot.topics):
+                bot.generate_question()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        calls.append(bot.llm_usage["calls"] - before["calls"])
+        tokens.append({
+            "prompt": bot.llm_usage["prompt_tokens"] - before["prompt_tokens"],
+            "output": bot.llm_usage["output_tokens"] - before["output_tokens"],
+        })
+
+    n = max(1, len(tokens))
+    return {
+        "latency": summarize(latencies),
+        "calls_per_turn": round(sum(calls) / n, 2),
+        "prompt_tokens_per_turn": round(sum(t["prompt"] for t in tokens) / n, 1),
+        "output_tokens_per_turn": round(sum(t["output"] for t in tokens) / n, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two-call vs combined grade+question latency and tokens")
+    parser.add_argument("--turns", type=int, default=10, help="Answers per mode")
+    parser.add_argument("--modes", default="two_call,combined")
+    parser.add_argument("--out", default="bench_llm_modes.json")
+    args = parser.parse_args()
+
+    import Brain
+    from Brain import AdaptiveInterviewer
+    if not Brain.keys_configured() and not Brain.llm_replay.is_replay():
+        raise SystemExit("❌ GEMINI_KEY_* must be set (any value works against fake_services.py), or run with LLM_MODE=replay")
+    # Only the LLM calls are measured; the real webhook would speak every benchmark question
+    AdaptiveInterviewer._send_to_webhook = lambda self: None
+
+    # One real session start, then every mode replays the same starting state
+    bot = AdaptiveInterviewer("Python developer. Built REST APIs and data pipelines.", "Software Engineer")
+    bot.topics = list(TOPICS)
+    bot.generate_question()
+    snapshot = bot.to_state()
+
+    results = {}
+    for mode in args.modes.split(","):
+        print(f"⏱️  {mode}: {args.turns} answers...")
+        results[mode] = run_mode(AdaptiveInterviewer.from_state(snapshot), snapshot, mode, args.turns)
+        stats = results[mode]
+        print(f"   p50 {stats['latency'].get('p50_ms', '-')} ms   p99 {stats['latency'].get('p99_ms', '-')} ms   "
+              f"{stats['calls_per_turn']} calls/turn   "
+              f"{stats['prompt_tokens_per_turn']} + {stats['output_tokens_per_turn']} tokens/turn")
+
+    report = {
+        "suite": "llm_modes",
+        "environment": environment(),
+        "config": {"turns": args.turns, "topics": TOPICS, "base_url": Brain.GEMINI_BASE_URL or "gemini",
+                   "llm_mode": Brain.llm_replay.LLM_MODE},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import base64
+import argparse
+import tracemalloc
+from collections import deque
+import numpy as np
+
+from _bench_utils import summarize, time_call, environment, finish
+
+# --- CONFIGURATION ---
+DEFAULT_RESOLUTIONS = "640x480,480x360,320x240"
+JPEG_QUALITY = 50          # The browser sends canvas.toDataURL('image/jpeg', 0.5)
+METRICS_BUFFER = 30        # Same rolling window as pro/server.py
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "video_thresholds.json")
+
+
+# --- FIXTURES ---
+def synthetic_frames(count, width, height, seed=0, sway=0.02):
+    """A head-and-shoulders silhouette that sways slightly over a gradient background (sway=0: still)."""
+    import cv2
+    rng = np.random.default_rng(seed)
+    background = np.tile(np.linspace(40, 200, width, dtype=np.uint8), (height, 1))
+    background = cv2.merge([background, background // 2 + 40, 255 - background])
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        dx = int(width * sway * np.sin(i / 15))
+        cx, cy = width // 2 + dx, int(height * 0.38)
+        cv2.ellipse(frame, (cx, int(height * 0.95)), (int(width * 0.28), int(height * 0.3)), 0, 180, 360, (60, 60, 90), -1)
+        cv2.circle(frame, (cx, cy), int(height * 0.16), (150, 180, 220), -1)
+        cv2.circle(frame, (cx - int(height * 0.05), cy - 10), 6, (30, 30, 30), -1)
+        cv2.circle(frame, (cx + int(height * 0.05), cy - 10), 6, (30, 30, 30), -1)
+        noise = rng.integers(0, 8, frame.shape, dtype=np.uint8)
+        frames.append(cv2.add(frame, noise))
+    return frames
+
+
+def video_frames(path, count, width, height):
+    """Up to `count` frames from a recorded clip, resized to the benchmark resolution."""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, (width, height)))
+    cap.release()
+    if not frames:
+        raise SystemExit(f"❌ Could not read any frames from {path}")
+    return frames
+
+
+def to_payload(frame):
+    """BGR frame -> the exact text message the browser sends (data URL with base64 JPEG)."""
+    import cv2
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode("ascii")
+
+
+# --- MEASUREMENT ---
+def per_item(fn, items, warmup=3):
+    """Times fn(item) once per item (cycling warm-up over the first items)."""
+    for item in items[:warmup]:
+        fn(item)
+    index = [0]
+
+    def step():
+        fn(items[index[0] % len(items)])
+        index[0] += 1
+
+    return time_call(step, len(items), warmup=0)
+
+
+def peak_alloc_per_item(fn, items):
+    """Average transient Python/numpy allocation peak (bytes) for one call of fn."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for item in items:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            fn(item)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return int(np.mean(peaks)) if peaks else 0
+
+
+def bench_resolution(width, height, frames, alloc_sample):
+    import cv2
+    import server
+
+    payloads = [to_payload(f) for f in frames]
+    jpegs = [server.decode_base64(p) for p in payloads]
+    arrays = [np.frombuffer(j, np.uint8) for j in jpegs]
+    decoded = [cv2.imdecode(a, cv2.IMREAD_COLOR) for a in arrays]
+    rgbs = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in decoded]
+    holistic = server.get_holistic()
+
+    # Rolling buffers like a live session, refilled with jittery landmarks per call
+    rng = np.random.default_rng(1)
+    landmark_sets = [
+        (deque(0.5 + 0.01 * rng.standard_normal((METRICS_BUFFER, 2)), maxlen=METRICS_BUFFER),
+         deque(0.5 + 0.005 * rng.standard_normal((METRICS_BUFFER, 2)), maxlen=METRICS_BUFFER),
+         deque(0.8 + 0.05 * rng.standard_normal(METRICS_BUFFER), maxlen=METRICS_BUFFER))
+        for _ in range(len(frames))
+    ]
+
+    stages = {
+        "base64_decode": (server.decode_base64, payloads),
+        "imdecode": (lambda a: cv2.imdecode(a, cv2.IMREAD_COLOR), arrays),
+        "cvtColor": (lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2RGB), decoded),
+        "holistic": (holistic.process, rgbs),
+        "processor.process": (server.processor.process, decoded),
+        "metrics": (lambda bufs: server.compute_realtime_metrics(*bufs), landmark_sets),
+    }
+
+    tag = f"@{width}x{height}"
+    results = {}
+    for name, (fn, items) in stages.items():
+        stats = summarize(per_item(fn, items))
+        stats["alloc_peak_bytes_per_frame"] = peak_alloc_per_item(fn, items[:alloc_sample])
+        results[name + tag] = stats
+
+    # One core runs decode -> process (cvtColor + holistic) -> metrics for every frame
+    pipeline_ms = sum(results[f"{name}{tag}"]["p50_ms"]
+                      for name in ("base64_decode", "imdecode", "processor.process", "metrics"))
+    detected = sum(1 for f in decoded[:alloc_sample] if server.processor.process(f) is not None)
+    results["pipeline" + tag] = {
+        "p50_ms": round(pipeline_ms, 3),
+        "frames_per_sec_per_core": round(1000 / pipeline_ms, 2) if pipeline_ms else None,
+        "landmark_hit_rate": round(detected / max(1, min(alloc_sample, len(decoded))), 3),
+    }
+    return results
+
+
+def gate_parity(width, height, count):
+    """
+    Scores of a still clip with the motion gate off and on. The gate may only save inference,
+    so the final report should not move: score_diff is the largest difference (0-100 scale).
+    """
+    import video_session
+    frames = synthetic_frames(count, width, height, sway=0)
+    reports = {}
+    try:
+        for gate in (False, True):
+            video_session.MOTION_GATE = gate
+            session = video_session.VideoSession()
+            for frame in frames:
+                session.process_frame(frame)
+            reports[gate] = session.final_report()
+            skip_ratio = session.gate.skip_ratio
+    finally:
+        video_session.MOTION_GATE = os.getenv("MOTION_GATE", "1") == "1"
+    keys = ("attention", "stability", "smoothness", "confidence")
+    return {
+        "score_diff": max(abs(reports[True].get(k, 0) - reports[False].get(k, 0)) for k in keys),
+        "gate_skip_ratio": round(skip_ratio, 3),
+        "gate_off": reports[False],
+        "gate_on": reports[True],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pro/server.py video hot path stage by stage")
+    parser.add_argument("--video", help="Recorded fixture clip; a synthetic frame sequence is used if omitted")
+    parser.add_argument("--frames", type=int, default=120, help="Frames per resolution")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS)
+    parser.add_argument("--alloc-sample", type=int, default=20, help="Frames traced for allocation stats")
+    parser.add_argument("--threads", type=int, default=1, help="cv2 threads (1 = per-core numbers)")
+    parser.add_argument("--out", default="bench_video.json")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--baseline", help="Previous bench_video.json to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    import cv2
+    import server
+    cv2.setNumThreads(args.threads)
+    server.load_vision()
+
+    results = {}
+    for resolution in args.resolutions.split(","):
+        width, height = (int(x) for x in resolution.lower().split("x"))
+        print(f"⏱️  Benchmarking {width}x{height}...")
+        if args.video:
+            frames = video_frames(args.video, args.frames, width, height)
+        else:
+            frames = synthetic_frames(args.frames, width, height)
+        results.update(bench_resolution(width, height, frames, args.alloc_sample))
+        results[f"gate_parity@{width}x{height}"] = gate_parity(width, height, args.frames)
+
+    report = {
+        "suite": "video",
+        "environment": environment(),
+        "config": {
+            "video": args.video,
+            "frames": args.frames,
+            "resolutions": args.resolutions,
+            "jpeg_quality": JPEG_QUALITY,
+            "cv2_threads": args.threads,
+        },
+        "results": results,
+    }
+    for name in sorted(results):
+        stats = results[name]
+        if "score_diff" in stats:
+            print(f"   {name:<32} score diff {stats['score_diff']}   ({stats['gate_skip_ratio']:.0%} of still frames reused)")
+            continue
+        extra = f"   {stats['frames_per_sec_per_core']} fps/core" if "frames_per_sec_per_core" in stats else ""
+        p99 = f"p99 {stats['p99_ms']:>8.2f} ms" if "p99_ms" in stats else ""
+        print(f"   {name:<32} p50 {stats['p50_ms']:>8.2f} ms   {p99}{extra}")
+
+    raise SystemExit(finish(report, args.out, args.thresholds, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import random
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+import uvicorn
+
+# Local stand-ins for everything the interview loop calls over the network:
+#   Gemini generateContent  -> run ai_server.py with GEMINI_BASE_URL=http://127.0.0.1:9000
+#   n8n webhook             -> WEBHOOK_URL=http://127.0.0.1:9000/webhook
+#   recognize_google        -> STT_URL=http://127.0.0.1:9000/stt
+# (GEMINI_KEY_* still need to be set, any non-empty value works.)
+
+app = FastAPI()
+
+# --- CONFIGURATION (overridden from the command line) ---
+LATENCY_MS = {"llm": 800, "stt": 300, "webhook": 50}
+JITTER = 0.2
+CORRECT_RATE = 0.6
+STATS = {"llm": 0, "stt": 0, "webhook": 0}
+
+FAKE_QUESTIONS = [
+    "How would you design a retry policy for a flaky downstream service?",
+    "Walk me through how you would debug a memory leak in production.",
+    "What trade-offs do you consider when choosing between a list and a set?",
+    "Explain how you would test a function that depends on the current time.",
+]
+FAKE_ANSWER = "I would start by measuring the problem, then isolate the component and add tests before changing it."
+
+
+async def simulate(kind):
+    STATS[kind] += 1
+    base = LATENCY_MS[kind] / 1000
+    await asyncio.sleep(max(0.0, random.uniform(base * (1 - JITTER), base * (1 + JITTER))))
+
+
+def fake_value(schema):
+    """Builds a plausible JSON value for a (Gemini-style) response schema."""
+    kind = schema.get("type", "STRING")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if str(k).lower() != "null"), "STRING")
+    kind = str(kind).upper()
+    if kind == "OBJECT":
+        return {name: fake_field(name, sub) for name, sub in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [fake_value(schema.get("items", {}))]
+    if kind == "BOOLEAN":
+        return random.random() < CORRECT_RATE
+    if kind in ("INTEGER", "NUMBER"):
+        return 2
+    return "Python"
+
+
+def fake_field(name, schema):
+    if name == "is_correct":
+        return random.random() < CORRECT_RATE
+    if name == "topics":
+        return [random.choice(["Python", "SQL", "System Design", "Data Structures"])]
+    if "question" in name:
+        return random.choice(FAKE_QUESTIONS)
+    if name in ("feedback", "summary"):
+        return "Reasonable answer with room for more detail."
+    return fake_value(schema)
+
+
+def gemini_response(text, prompt_chars):
+    tokens_in = max(1, prompt_chars // 4)
+    tokens_out = max(1, len(text) // 4)
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": tokens_in,
+            "candidatesTokenCount": tokens_out,
+            "totalTokenCount": tokens_in + tokens_out,
+        },
+    }
+
+
+# --- FAKE GEMINI ---
+@app.post("/{version}/models/{model_action}")
+async def generate_content(version: str, model_action: str, request: Request):
+    body = await request.json()
+    await simulate("llm")
+
+    config = body.get("generationConfig", {})
+    # Depending on the SDK version the pydantic schema arrives as responseSchema or responseJsonSchema
+    schema = config.get("responseSchema") or config.get("responseJsonSchema")
+    if schema:
+        text = json.dumps(fake_value(schema))
+    else:
+        text = random.choice(FAKE_QUESTIONS)
+    return gemini_response(text, len(json.dumps(body.get("contents", ""))))
+
+
+# --- FAKE WEBHOOK ---
+@app.post("/webhook")
+async def webhook(request: Request):
+    await request.body()
+    await simulate("webhook")
+    return {"ok": True}
+
+
+# --- FAKE STT ---
+@app.post("/stt")
+async def stt(request: Request):
+    audio = await request.body()
+    await simulate("stt")
+    return {"text": FAKE_ANSWER if len(audio) > 1000 else ""}
+
+
+@app.get("/stats")
+async def stats():
+    return {"calls": STATS, "latency_ms": LATENCY_MS, "jitter": JITTER}
+
+
+def main():
+    global JITTER, CORRECT_RATE
+    parser = argparse.ArgumentParser(description="Fake Gemini / webhook / STT services with configurable latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--llm-latency-ms", type=float, default=LATENCY_MS["llm"])
+    parser.add_argument("--stt-latency-ms", type=float, default=LATENCY_MS["stt"])
+    parser.add_argument("--webhook-latency-ms", type=float, default=LATENCY_MS["webhook"])
+    parser.add_argument("--jitter", type=float, default=JITTER, help="Uniform +/- fraction applied to every latency")
+    parser.add_argument("--correct-rate", type=float, default=CORRECT_RATE, help="Share of answers graded correct")
+    args = parser.parse_args()
+
+    LATENCY_MS.update(llm=args.llm_latency_ms, stt=args.stt_latency_ms, webhook=args.webhook_latency_ms)
+    JITTER = args.jitter
+    CORRECT_RATE = args.correct_rate
+    print(f"🧪 Fake services on http://{args.host}:{args.port} latency={LATENCY_MS} jitter=±{JITTER:.0%}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import json
+import time
+import base64
+import asyncio
+import argparse
+from collections import deque
+
+from _bench_utils import summarize, environment
+
+# Simulated candidates against both servers:
+#   video: ws://<video-host>/ws       (pro/server.py)      base64 JPEG frames at --fps, then "STOP"
+#   audio: ws://<audio-host>/ws/audio (Brain/ai_server.py) init -> audio chunks in real time -> STOP_ANSWER
+# Start benchmarks/fake_services.py and point the servers at it to take Gemini/STT/webhook out of the picture.
+
+# --- CONFIGURATION ---
+CHUNK_INTERVAL_S = 0.25    # MediaRecorder timeslice used by the frontend
+RECV_TIMEOUT_S = 60
+
+
+class SessionStats:
+    def __init__(self):
+        self.first_question_ms = []
+        self.answer_to_question_ms = []
+        self.audio_feed_lag_ms = []
+        self.video_feed_lag_ms = []
+        self.errors = []
+        self.sessions = 0
+        self.completed = 0
+
+    def merge(self, other):
+        for name in ("first_question_ms", "answer_to_question_ms", "audio_feed_lag_ms", "video_feed_lag_ms", "errors"):
+            getattr(self, name).extend(getattr(other, name))
+        self.sessions += other.sessions
+        self.completed += other.completed
+
+
+# --- FIXTURES ---
+def load_audio_chunks(path, seconds):
+    """WebM bytes split into even-sized chunks, roughly one per CHUNK_INTERVAL_S of audio."""
+    if path:
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        from bench_audio import synthetic_voice, to_webm_bytes
+        data = to_webm_bytes(synthetic_voice(seconds))
+    n_chunks = max(1, int(seconds / CHUNK_INTERVAL_S))
+    size = max(2, (len(data) // n_chunks) & ~1)
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def load_frame_payloads(path, count):
+    from bench_video import synthetic_frames, video_frames, to_payload
+    frames = video_frames(path, count, 640, 480) if path else synthetic_frames(count, 640, 480)
+    return [to_payload(f) for f in frames]
+
+
+# --- SIMULATED CANDIDATE ---
+async def audio_candidate(url, chunks, answers, stats):
+    import websockets
+    feed_sent = deque()
+    turns = asyncio.Queue()
+
+    async with websockets.connect(url, max_size=None) as ws:
+        async def reader():
+            # Feed replies are timed as they arrive; questions / end go to the turn queue
+            while True:
+                data = json.loads(await ws.recv())
+                kind = data.get("type")
+                if kind == "realtime_feed":
+                    # Feed updates are coalesced server-side: one reply covers every chunk sent so far,
+                    # so the lag is measured from the oldest unanswered chunk
+                    if feed_sent:
+                        stats.audio_feed_lag_ms.append((time.perf_counter() - feed_sent[0]) * 1000)
+                        feed_sent.clear()
+                elif kind in ("question", "end"):
+                    await turns.put(data)
+
+        read_task = asyncio.create_task(reader())
+        try:
+            started = time.perf_counter()
+            await ws.send(json.dumps({"resumeText": "Python developer. Built REST APIs and data pipelines.",
+                                      "jobDescription": "Software Engineer"}))
+            await asyncio.wait_for(turns.get(), RECV_TIMEOUT_S)
+            stats.first_question_ms.append((time.perf_counter() - started) * 1000)
+
+            for _ in range(answers):
+                # Stream the answer in real time
+                for chunk in chunks:
+                    feed_sent.append(time.perf_counter())
+                    await ws.send(json.dumps({"bytes": base64.b64encode(chunk).decode("ascii")}))
+                    await asyncio.sleep(CHUNK_INTERVAL_S)
+
+                stop_at = time.perf_counter()
+                await ws.send(json.dumps({"text": "STOP_ANSWER"}))
+                reply = await asyncio.wait_for(turns.get(), RECV_TIMEOUT_S)
+                stats.answer_to_question_ms.append((time.perf_counter() - stop_at) * 1000)
+                feed_sent.clear()
+                if reply.get("type") == "end":
+                    break
+        finally:
+            read_task.cancel()
+
+
+async def video_candidate(url, payloads, fps, duration_s, stats):
+    import websockets
+    sent = deque()
+    interval = 1.0 / fps
+
+    async with websockets.connect(url, max_size=None) as ws:
+        async def reader():
+            while True:
+                data = json.loads(await ws.recv())
+                if data.get("type") == "final_report":
+                    return data
+                # queue / throttle notices from admission control are not frame replies
+                if data.get("type") == "realtime" and sent:
+                    stats.video_feed_lag_ms.append((time.perf_counter() - sent[0]) * 1000)
+                    sent.clear()
+
+        read_task = asyncio.create_task(reader())
+        deadline = time.perf_counter() + duration_s
+        i = 0
+        while time.perf_counter() < deadline and not read_task.done():
+            sent.append(time.perf_counter())
+            await ws.send(payloads[i % len(payloads)])
+            i += 1
+            await asyncio.sleep(interval)
+
+        await ws.send("STOP")
+        await asyncio.wait_for(read_task, RECV_TIMEOUT_S)
+
+
+async def candidate(args, chunks, payloads):
+    stats = SessionStats()
+    stats.sessions = 1
+    jobs = []
+    if args.audio_url:
+        jobs.append(audio_candidate(args.audio_url, chunks, args.answers, stats))
+    if args.video_url:
+        answer_s = len(chunks) * CHUNK_INTERVAL_S
+        duration = args.video_seconds or (answer_s + 3) * args.answers
+        jobs.append(video_candidate(args.video_url, payloads, args.fps, duration, stats))
+
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    stats.errors.extend(f"{type(e).__name__}: {e}" for e in errors)
+    if not errors:
+        stats.completed = 1
+    return stats
+
+
+async def run_level(concurrency, args, chunks, payloads):
+    # Stagger connects a little so the ramp measures steady state rather than a thundering herd
+    async def delayed(i):
+        await asyncio.sleep(i * args.stagger)
+        return await candidate(args, chunks, payloads)
+
+    level = SessionStats()
+    for stats in await asyncio.gather(*(delayed(i) for i in range(concurrency))):
+        level.merge(stats)
+    return level
+
+
+def level_report(concurrency, level, elapsed_s):
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed_s, 2),
+        "sessions": level.sessions,
+        "completed": level.completed,
+        "error_rate": round(1 - level.completed / level.sessions, 3) if level.sessions else 0,
+        "errors": level.errors[:20],
+        "first_question": summarize(level.first_question_ms),
+        "answer_to_next_question": summarize(level.answer_to_question_ms),
+        "audio_feed_lag": summarize(level.audio_feed_lag_ms),
+        "video_feed_lag": summarize(level.video_feed_lag_ms),
+    }
+
+
+async def main_async(args):
+    chunks = load_audio_chunks(args.audio, args.answer_seconds) if args.audio_url else []
+    payloads = load_frame_payloads(args.video, 60) if args.video_url else []
+
+    levels = []
+    for concurrency in (int(x) for x in args.ramp.split(",")):
+        print(f"\n👥 {concurrency} concurrent candidates...")
+        started = time.perf_counter()
+        level = await run_level(concurrency, args, chunks, payloads)
+        report = level_report(concurrency, level, time.perf_counter() - started)
+        levels.append(report)
+
+        a2q = report["answer_to_next_question"]
+        lag = report["video_feed_lag"]
+        print(f"   answer->question p50 {a2q.get('p50_ms', '-')} ms, p99 {a2q.get('p99_ms', '-')} ms | "
+              f"video lag p50 {lag.get('p50_ms', '-')} ms | errors {report['error_rate']:.0%}")
+        if report["error_rate"] > args.stop_error_rate:
+            print(f"🛑 Error rate above {args.stop_error_rate:.0%}, stopping the ramp.")
+            break
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load generator for both PrepAI servers")
+    parser.add_argument("--video-url", default="ws://127.0.0.1:8000/ws", help="Empty string to skip video")
+    parser.add_argument("--audio-url", default="ws://127.0.0.1:8001/ws/audio", help="Empty string to skip audio")
+    parser.add_argument("--ramp", default="1,2,5,10,20", help="Comma-separated concurrency levels")
+    parser.add_argument("--answers", type=int, default=3, help="Answers per candidate")
+    parser.add_argument("--answer-seconds", type=float, default=8, help="Length of each streamed answer")
+    parser.add_argument("--fps", type=float, default=10, help="Video frames per second (frontend sends 10)")
+    parser.add_argument("--video-seconds", type=float, default=0, help="Video duration (default: follows audio)")
+    parser.add_argument("--audio", help="Recorded WebM answer to stream (synthetic if omitted)")
+    parser.add_argument("--video", help="Recorded clip to stream (synthetic if omitted)")
+    parser.add_argument("--stagger", type=float, default=0.05, help="Seconds between connects within a level")
+    parser.add_argument("--stop-error-rate", type=float, default=0.5)
+    parser.add_argument("--out", default="bench_load.json")
+    args = parser.parse_args()
+
+    levels = asyncio.run(main_async(args))
+    report = {
+        "suite": "load",
+        "environment": environment(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "levels": levels,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
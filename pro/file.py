@@ -2,25 +2,20 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import pandas as pd
-import xgboost as xgb
 import time
 from collections import deque
 import os
+import sys
 
-# --- CONFIGURATION ---
-
-# 1. Get the directory where THIS script is located
-script_dir = os.path.dirname(os.path.abspath(__file__))
+# Shared/ holds the process-wide model registry
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Shared"))
+from model_registry import get_video_model, registry, VIDEO_MODEL_PATH
 
-# 2. Force Python to look for the model in that specific directory
-MODEL_PATH = os.path.join(script_dir, "temp_100_video_model.json")
-# NOTE: If you downloaded the 1000-video model, change the name above to 'final_interview_model.json'
-
-print(f"📂 Looking for model at: {MODEL_PATH}")
+# --- CONFIGURATION ---
 
-if not os.path.exists(MODEL_PATH):
-    print("❌ ERROR: File not found at the path above.")
-    exit()
+# The model path lives in Shared/model_registry.py (next to this script: temp_100_video_model.json)
+# NOTE: If you downloaded the 1000-video model, change VIDEO_MODEL_PATH there to 'final_interview_model.json'
+MODEL_PATH = VIDEO_MODEL_PATH
 
 BUFFER_SIZE = 150  # Approx 5 seconds @ 30fps
 
@@ -28,11 +23,18 @@ BUFFER_SIZE = 150  # Approx 5 seconds @ 30fps
 mp_holistic = mp.solutions.holistic
 mp_drawing = mp.solutions.drawing_utils
 
-# --- 2. LOAD YOUR TRAINED MODEL ---
-print("Loading AI Model...")
-model = xgb.XGBRegressor()
-model.load_model(MODEL_PATH)
-print("✅ Model Loaded!")
+# --- 2. YOUR TRAINED MODEL ---
+# Loaded on first use through the registry (see load_model), not at import time
+def load_model():
+    print(f"📂 Looking for model at: {MODEL_PATH}")
+    if not os.path.exists(MODEL_PATH):
+        print("❌ ERROR: File not found at the path above.")
+        exit()
+    print("Loading AI Model...")
+    model = get_video_model()
+    stats = registry.stats().get("video_xgb", {})
+    print(f"✅ Model Loaded! ({stats.get('load_ms', 0)} ms, ~{stats.get('resident_bytes', 0) // 1024} KiB resident)")
+    return model
 
 # --- 3. HELPER CLASS ---
 class BodyLanguageProcessor:
@@ -79,6 +81,7 @@ class BodyLanguageProcessor:
 
 # --- 4. MAIN APPLICATION LOOP ---
 def main():
+    model = load_model()
     cap = cv2.VideoCapture(0)
     processor = BodyLanguageProcessor()
     
@@ -1,69 +1,106 @@
-import cv2
-import mediapipe as mp
-import numpy as np
-import base64
+import os
+import sys
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from collections import deque
-
-app = FastAPI()
-
-# --- SETUP MEDIAPIPE ---
-mp_holistic = mp.solutions.holistic
-holistic = mp_holistic.Holistic(
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
+import time
+import uuid
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+# Shared/ holds helpers used by both servers
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Shared"))
+from startup import StartupReport
+import telemetry
+from admission import CapacityScheduler
+from feed import FeedPublisher, feed_options
+from timeline import SessionTimeline, timeline_report, start_retention, valid_session_id
+from admin import admin_allowed
+# Per-session video analysis lives in video_session.py so the gateway (/ws/session) can reuse it
+from video_session import (
+    BodyLanguageProcessor, VideoSession, processor, load_vision, get_holistic,
+    decode_base64, decode_frame, compute_realtime_metrics, to_realtime_message, warm_up_vision,
+    estimated_cost, record_frame_seconds,
 )
 
-# --- HELPER CLASS ---
-class BodyLanguageProcessor:
-    def process(self, frame):
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = holistic.process(image)
-        
-        if results.pose_landmarks and results.face_landmarks:
-            left_wrist = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.LEFT_WRIST]
-            right_wrist = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.RIGHT_WRIST]
-            wrist_x = (left_wrist.x + right_wrist.x) / 2
-            wrist_y = (left_wrist.y + right_wrist.y) / 2
-            
-            nose = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.NOSE]
-            stab_x, stab_y = nose.x, nose.y
-            
-            left_ear = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.LEFT_EAR]
-            right_ear = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.RIGHT_EAR]
-            ear_mid_x = (left_ear.x + right_ear.x) / 2
-            ear_mid_y = (left_ear.y + right_ear.y) / 2
-            offset_x = abs(nose.x - ear_mid_x)
-            offset_y = abs(nose.y - ear_mid_y)
-            dist_from_center = (offset_x**2 + offset_y**2)**0.5
-            
-            attn_score = max(0, 1.0 - (dist_from_center * 5.0))
-            
-            return {
-                "wrist": [wrist_x, wrist_y],
-                "stability": [stab_x, stab_y],
-                "attention": attn_score
-            }
-        return None
-
-processor = BodyLanguageProcessor()
+app = FastAPI()
+startup_report = StartupReport("video_server")
+
+# How long a session waits for warm-up before it is served anyway (cold)
+READY_WAIT_SECONDS = 30
+
+# Frames are processed on the event loop thread, so the budget is the share of one core the frame
+# loop may use (busy seconds per second). Above ~80% of it sessions are sampled at a lower fps;
+# when even that does not fit, new sessions queue and then get turned away.
+VIDEO_CAPACITY = float(os.getenv("VIDEO_CAPACITY", "0.8"))
+scheduler = CapacityScheduler("video_server", VIDEO_CAPACITY)
+
+# --- STARTUP: BACKGROUND WARM-UP ---
+@app.on_event("startup")
+async def start_warm_up():
+    startup_report.start_warmup(warm_up_vision)
+    start_retention()
+
+@app.get("/ready")
+async def ready():
+    # Readiness probe: 503 until warm-up has finished, so the balancer holds traffic back
+    status = 200 if startup_report.is_ready else 503
+    return JSONResponse(startup_report.as_dict(), status_code=status)
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(telemetry.render(), media_type=telemetry.CONTENT_TYPE)
+
+@app.get("/capacity")
+async def capacity():
+    return scheduler.stats()
+
+@app.get("/timeline/{session_id}")
+async def session_timeline(request: Request, session_id: str, stream: str = None, start: float = None, end: float = None, points: int = 500):
+    # Downsampled per-session metric history (see Shared/timeline.py)
+    if not admin_allowed(request):
+        return JSONResponse({"error": "forbidden"}, status_code=403)
+    try:
+        report = timeline_report(session_id, stream, start, end, points)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not report:
+        return JSONResponse({"error": "No timeline for this session"}, status_code=404)
+    return report
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     print("🟢 Client Connected!")
+    await startup_report.wait_ready(READY_WAIT_SECONDS)
+    load_vision()
 
-    # Live Rolling Buffers (For real-time bars)
-    BUFFER_SIZE = 30 
-    wrist_buffer = deque(maxlen=BUFFER_SIZE)
-    stab_buffer = deque(maxlen=BUFFER_SIZE)
-    attn_buffer = deque(maxlen=BUFFER_SIZE)
+    async def send(payload):
+        await websocket.send_text(json.dumps(payload))
 
-    # --- SESSION ACCUMULATORS (For Database Storage) ---
-    session_attention = []
-    session_stability = []
-    session_smoothness = []
+    session = VideoSession()
+    # ?feedRate=..&feedDelta=1&feedEncoding=msgpack, see Shared/feed.py
+    feed = FeedPublisher(send, websocket.send_bytes, **feed_options(websocket.query_params))
+    # A new session is admitted at the sampling rate everyone is currently getting
+    try:
+        ticket = await scheduler.admit(estimated_cost(stride=scheduler.sample_stride()), send, demand=estimated_cost())
+    except Exception:
+        print("🔴 Client left the queue")
+        return
+    if ticket is None:
+        print("⛔ Video server at capacity, session rejected")
+        await send({"type": "rejected", "reason": "capacity", "retryAfter": scheduler.eta_s(1)})
+        await websocket.close(code=1013)
+        return
+    telemetry.ACTIVE_SESSIONS.labels("video_server").inc()
+
+    # ?session=<interview token> files the video timeline with the interview's audio / answers
+    # (anything that does not look like a token gets a fresh id instead of writing under a made-up one)
+    timeline_id = websocket.query_params.get("session")
+    if not valid_session_id(timeline_id):
+        if timeline_id:
+            print("⚠️ Ignoring malformed ?session= id, recording under a new timeline id")
+        timeline_id = uuid.uuid4().hex
+    timeline = SessionTimeline(timeline_id)
+    await send({"type": "timeline", "session": timeline_id})
 
     try:
         while True:
@@ -72,80 +109,45 @@ async def websocket_endpoint(websocket: WebSocket):
             # --- 1. CHECK FOR STOP COMMAND ---
             if data == "STOP":
                 print("🛑 End of Interview Detected. Generating Report...")
-                
-                final_response = {"type": "final_report"}
-                
-                if len(session_attention) > 0:
-                    avg_attn = np.mean(session_attention)
-                    avg_stab = np.mean(session_stability)
-                    avg_smooth = np.mean(session_smoothness)
-                    
-                    # FINAL FORMULA
-                    final_conf = (0.4 * avg_attn) + (0.4 * avg_stab) + (0.2 * avg_smooth)
-                    
-                    final_response = {
-                        "type": "final_report",
-                        "attention": int(avg_attn),
-                        "stability": int(avg_stab),
-                        "smoothness": int(avg_smooth),
-                        "confidence": int(final_conf)
-                    }
-                
-                await websocket.send_text(json.dumps(final_response))
+                print(f"   🎞️ Motion gate reused landmarks for {session.gate.skip_ratio:.0%} of frames")
+                feed.close()
+                await websocket.send_text(json.dumps(session.final_report()))
                 break # Exit the loop to close connection cleanly
 
             # --- 2. PROCESS FRAME ---
+            telemetry.FRAMES.inc()
+            stride = scheduler.sample_stride()
+            if stride != session.stride:
+                # Lets the client lower its own send rate; older clients ignore unknown types
+                await send({"type": "throttle", "fps": round(session.fps() / stride, 1)})
+            if not session.sample(stride):
+                telemetry.DROPPED_FRAMES.labels("shed").inc()
+                await feed.publish(session.last_response)
+                continue
+
+            started = time.perf_counter()
             try:
-                if "base64," in data:
-                    data = data.split("base64,")[1]
-                image_data = base64.b64decode(data)
-                np_arr = np.frombuffer(image_data, np.uint8)
-                frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+                with telemetry.FRAME_DECODE.time():
+                    frame = decode_frame(data)
             except Exception:
+                telemetry.DROPPED_FRAMES.labels("decode_error").inc()
                 continue
 
-            if frame is None: continue
-
-            metrics = processor.process(frame)
-            response = {"type": "realtime", "attention": 0, "stability": 0, "smoothness": 0, "confidence": 0}
-
-            if metrics:
-                wrist_buffer.append(metrics['wrist'])
-                stab_buffer.append(metrics['stability'])
-                attn_buffer.append(metrics['attention'])
-
-                if len(wrist_buffer) > 5:
-                    # Calc Realtime Stats
-                    stab_arr = np.array(stab_buffer)
-                    var_stab = np.std(stab_arr, axis=0).mean()
-                    disp_stability = max(0, min(100, 100 - (var_stab * 1000)))
-
-                    wrist_arr = np.array(wrist_buffer)
-                    velocity = np.diff(wrist_arr, axis=0)
-                    accel = np.diff(velocity, axis=0)
-                    jerk = np.diff(accel, axis=0)
-                    jerk_score = np.linalg.norm(jerk, axis=1).mean() if len(jerk) > 0 else 0
-                    disp_smoothness = max(0, min(100, 100 - (jerk_score * 100)))
-
-                    attn_mean = np.mean(attn_buffer)
-                    disp_attention = min(100, attn_mean * 100)
-
-                    confidence_score = (0.4 * disp_attention) + (0.4 * disp_stability) + (0.2 * disp_smoothness)
-
-                    # --- ADD TO SESSION HISTORY ---
-                    session_attention.append(disp_attention)
-                    session_stability.append(disp_stability)
-                    session_smoothness.append(disp_smoothness)
-
-                    response = {
-                        "type": "realtime",
-                        "attention": int(disp_attention),
-                        "stability": int(disp_stability),
-                        "smoothness": int(disp_smoothness),
-                        "confidence": int(confidence_score)
-                    }
+            if frame is None:
+                telemetry.DROPPED_FRAMES.labels("decode_error").inc()
+                continue
 
-            await websocket.send_text(json.dumps(response))
+            response = session.process_frame(frame)
+            record_frame_seconds(time.perf_counter() - started)
+            ticket.update(session.cost(), session.demand())
+            if session.last_sample:
+                timeline.append("video", **{k: response[k] for k in ("attention", "stability", "smoothness", "confidence")})
+            await feed.publish(response)
 
     except WebSocketDisconnect:
-        print("🔴 Client Disconnected")
\ No newline at end of file
+        print("🔴 Client Disconnected")
+    finally:
+        feed.close()
+        timeline.close()
+        ticket.release()
+        telemetry.ACTIVE_SESSIONS.labels("video_server").dec()
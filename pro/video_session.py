@@ -0,0 +1,293 @@
+import os
+import time
+import base64
+import threading
+import numpy as np
+from collections import deque
+
+import telemetry
+
+# Body-language analysis for one interview, shared by pro/server.py (/ws) and the
+# multiplexed gateway in Brain/ai_server.py (/ws/session). Needs Shared/ on sys.path.
+
+# --- SETUP MEDIAPIPE (LAZY) ---
+# cv2 + mediapipe take seconds to import and the Holistic graph takes longer to build,
+# so both happen on first use (normally inside warm_up) instead of at import.
+cv2 = None
+mp_holistic = None
+holistic = None
+_holistic_lock = threading.Lock()
+
+def load_vision():
+    global cv2, mp_holistic
+    if mp_holistic is None:
+        with _holistic_lock:
+            if mp_holistic is None:
+                import cv2 as cv2_module
+                import mediapipe as mp
+                cv2 = cv2_module
+                mp_holistic = mp.solutions.holistic
+
+def get_holistic():
+    global holistic
+    load_vision()
+    if holistic is None:
+        with _holistic_lock:
+            if holistic is None:
+                holistic = mp_holistic.Holistic(
+                    min_detection_confidence=0.5,
+                    min_tracking_confidence=0.5
+                )
+    return holistic
+
+# --- LOAD ESTIMATE (admission control) ---
+NOMINAL_FPS = 10            # The frontend sends a frame every 100 ms
+frame_seconds = 0.03        # Decode + inference time per frame (EWMA), shared by every session
+
+def record_frame_seconds(seconds):
+    global frame_seconds
+    frame_seconds = 0.9 * frame_seconds + 0.1 * seconds
+
+def estimated_cost(fps=NOMINAL_FPS, stride=1):
+    """Busy seconds per second one session puts on the frame loop."""
+    return fps / stride * frame_seconds
+
+# --- HELPER CLASS ---
+class BodyLanguageProcessor:
+    def process(self, frame):
+        holistic = get_holistic()
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with telemetry.HOLISTIC_INFERENCE.time():
+            results = holistic.process(image)
+
+        if results.pose_landmarks and results.face_landmarks:
+            left_wrist = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.LEFT_WRIST]
+            right_wrist = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.RIGHT_WRIST]
+            wrist_x = (left_wrist.x + right_wrist.x) / 2
+            wrist_y = (left_wrist.y + right_wrist.y) / 2
+
+            nose = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.NOSE]
+            stab_x, stab_y = nose.x, nose.y
+
+            left_ear = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.LEFT_EAR]
+            right_ear = results.pose_landmarks.landmark[mp_holistic.PoseLandmark.RIGHT_EAR]
+            ear_mid_x = (left_ear.x + right_ear.x) / 2
+            ear_mid_y = (left_ear.y + right_ear.y) / 2
+            offset_x = abs(nose.x - ear_mid_x)
+            offset_y = abs(nose.y - ear_mid_y)
+            dist_from_center = (offset_x**2 + offset_y**2)**0.5
+
+            attn_score = max(0, 1.0 - (dist_from_center * 5.0))
+
+            return {
+                "wrist": [wrist_x, wrist_y],
+                "stability": [stab_x, stab_y],
+                "attention": attn_score
+            }
+        return None
+
+processor = BodyLanguageProcessor()
+
+# --- MOTION GATE ---
+# A candidate sitting still produces nearly identical frames. Each frame is shrunk to a small grayscale
+# thumbnail and compared with the thumbnail of the last frame Holistic actually ran on; below the
+# threshold the previous landmarks are reused. Comparing against the last *inferred* frame (not the
+# previous one) means slow drift still adds up and triggers inference, and MOTION_MAX_SKIP bounds
+# how stale reused landmarks can get.
+MOTION_GATE = os.getenv("MOTION_GATE", "1") == "1"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "2.0"))     # Mean absolute pixel difference (0-255)
+MOTION_MAX_SKIP = int(os.getenv("MOTION_MAX_SKIP", "5"))           # Consecutive reused frames at most
+THUMBNAIL_SIZE = (64, 48)
+
+class MotionGate:
+    """Per-session: decides whether a frame needs inference or can reuse the last landmarks."""
+    def __init__(self):
+        self.reference = None    # Thumbnail of the last inferred frame
+        self.skipped_in_row = 0
+        self.inferred = 0
+        self.reused = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def should_infer(self, thumbnail):
+        if not MOTION_GATE or self.reference is None or self.skipped_in_row >= MOTION_MAX_SKIP:
+            return True
+        return float(cv2.absdiff(thumbnail, self.reference).mean()) >= MOTION_THRESHOLD
+
+    def record(self, thumbnail, inferred):
+        if inferred:
+            self.reference = thumbnail
+            self.skipped_in_row = 0
+            self.inferred += 1
+        else:
+            self.skipped_in_row += 1
+            self.reused += 1
+        telemetry.MOTION_GATE.labels("inferred" if inferred else "reused").inc()
+
+    @property
+    def skip_ratio(self):
+        total = self.inferred + self.reused
+        return self.reused / total if total else 0.0
+
+# --- FRAME DECODE ---
+def decode_base64(data):
+    """data-URL or bare base64 text -> JPEG bytes."""
+    if "base64," in data:
+        data = data.split("base64,")[1]
+    return base64.b64decode(data)
+
+def decode_jpeg(jpeg_bytes):
+    """JPEG bytes -> BGR frame, or None if undecodable."""
+    np_arr = np.frombuffer(jpeg_bytes, np.uint8)
+    return cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+def decode_frame(data):
+    """Base64 JPEG (as sent by the browser canvas) -> BGR frame, or None if undecodable."""
+    return decode_jpeg(decode_base64(data))
+
+# --- REALTIME METRICS ---
+def compute_realtime_metrics(wrist_buffer, stab_buffer, attn_buffer):
+    """Rolling-window attention / stability / smoothness / confidence on a 0-100 scale (floats)."""
+    stab_arr = np.array(stab_buffer)
+    var_stab = np.std(stab_arr, axis=0).mean()
+    disp_stability = max(0, min(100, 100 - (var_stab * 1000)))
+
+    wrist_arr = np.array(wrist_buffer)
+    velocity = np.diff(wrist_arr, axis=0)
+    accel = np.diff(velocity, axis=0)
+    jerk = np.diff(accel, axis=0)
+    jerk_score = np.linalg.norm(jerk, axis=1).mean() if len(jerk) > 0 else 0
+    disp_smoothness = max(0, min(100, 100 - (jerk_score * 100)))
+
+    attn_mean = np.mean(attn_buffer)
+    disp_attention = min(100, attn_mean * 100)
+
+    confidence_score = (0.4 * disp_attention) + (0.4 * disp_stability) + (0.2 * disp_smoothness)
+    return {
+        "attention": disp_attention,
+        "stability": disp_stability,
+        "smoothness": disp_smoothness,
+        "confidence": confidence_score,
+    }
+
+def to_realtime_message(metrics):
+    return {
+        "type": "realtime",
+        "attention": int(metrics["attention"]),
+        "stability": int(metrics["stability"]),
+        "smoothness": int(metrics["smoothness"]),
+        "confidence": int(metrics["confidence"])
+    }
+
+# --- PER-SESSION STATE ---
+class VideoSession:
+    """Rolling buffers for the live bars plus the session history behind the final report."""
+    BUFFER_SIZE = 30
+
+    def __init__(self):
+        # Live Rolling Buffers (For real-time bars)
+        self.wrist_buffer = deque(maxlen=self.BUFFER_SIZE)
+        self.stab_buffer = deque(maxlen=self.BUFFER_SIZE)
+        self.attn_buffer = deque(maxlen=self.BUFFER_SIZE)
+
+        # --- SESSION ACCUMULATORS (For Database Storage) ---
+        self.session_attention = []
+        self.session_stability = []
+        self.session_smoothness = []
+
+        self.gate = MotionGate()
+        self.last_metrics = None    # Landmarks of the last inferred frame, reused while the gate skips
+        self.last_sample = None     # (attention, stability, smoothness) of the last frame
+
+        # --- LOAD SHEDDING ---
+        self.stride = 1                                     # Process 1 in `stride` frames
+        self.frames_seen = 0
+        self.arrivals = deque(maxlen=3 * NOMINAL_FPS)       # Arrival times, for the incoming fps
+        self.last_response = {"type": "realtime", "attention": 0, "stability": 0, "smoothness": 0, "confidence": 0}
+
+    def sample(self, stride):
+        """Counts an incoming frame; False if it should be skipped at the current stride."""
+        self.arrivals.append(time.monotonic())
+        self.stride = stride
+        self.frames_seen += 1
+        return (self.frames_seen - 1) % stride == 0
+
+    def fps(self):
+        if len(self.arrivals) < 2:
+            return NOMINAL_FPS
+        span = self.arrivals[-1] - self.arrivals[0]
+        return (len(self.arrivals) - 1) / span if span > 0 else NOMINAL_FPS
+
+    def cost(self):
+        return estimated_cost(self.fps(), self.stride)
+
+    def demand(self):
+        # Cost without load shedding; the scheduler picks the stride from this
+        return estimated_cost(self.fps())
+
+    def process_frame(self, frame):
+        """BGR frame -> realtime message (all zeros until enough landmarks are buffered)."""
+        thumbnail = self.gate.thumbnail(frame)
+        inferred = self.gate.should_infer(thumbnail)
+        self.gate.record(thumbnail, inferred)
+        # A reused frame goes through the buffers like any other, with the last landmarks: that is
+        # what a still candidate produces without the gate, so the rolling window keeps the same
+        # span and spacing and the stability / smoothness scores do not depend on MOTION_GATE
+        metrics = processor.process(frame) if inferred else self.last_metrics
+        self.last_metrics = metrics
+        response = {"type": "realtime", "attention": 0, "stability": 0, "smoothness": 0, "confidence": 0}
+
+        self.last_sample = None
+        if metrics:
+            self.wrist_buffer.append(metrics['wrist'])
+            self.stab_buffer.append(metrics['stability'])
+            self.attn_buffer.append(metrics['attention'])
+
+            if len(self.wrist_buffer) > 5:
+                with telemetry.METRICS_COMPUTE.time():
+                    response = compute_realtime_metrics(self.wrist_buffer, self.stab_buffer, self.attn_buffer)
+
+                # --- ADD TO SESSION HISTORY ---
+                self.session_attention.append(response["attention"])
+                self.session_stability.append(response["stability"])
+                self.session_smoothness.append(response["smoothness"])
+                self.last_sample = (response["attention"], response["stability"], response["smoothness"])
+
+                response = to_realtime_message(response)
+        self.last_response = response
+        return response
+
+    def final_report(self):
+        final_response = {"type": "final_report"}
+
+        if len(self.session_attention) > 0:
+            avg_attn = np.mean(self.session_attention)
+            avg_stab = np.mean(self.session_stability)
+            avg_smooth = np.mean(self.session_smoothness)
+
+            # FINAL FORMULA
+            final_conf = (0.4 * avg_attn) + (0.4 * avg_stab) + (0.2 * avg_smooth)
+
+            final_response = {
+                "type": "final_report",
+                "attention": int(avg_attn),
+                "stability": int(avg_stab),
+                "smoothness": int(avg_smooth),
+                "confidence": int(final_conf)
+            }
+        return final_response
+
+# --- STARTUP: BACKGROUND WARM-UP ---
+def warm_up_vision(report):
+    """Imports the vision stack, builds the Holistic graph and runs one dummy frame through it."""
+    with report.stage("import cv2 + mediapipe"):
+        load_vision()
+    with report.stage("build holistic graph"):
+        get_holistic()
+    with report.stage("dummy inference"):
+        blank = np.zeros((480, 640, 3), dtype=np.uint8)
+        ok, jpeg = cv2.imencode(".jpg", blank)
+        frame = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+        processor.process(frame)